@@ -0,0 +1,232 @@
+"""
+Batch mode for degrees: answers many (source, target) queries in one process.
+
+Queries are read one per line, as two person ids or names separated by a tab or
+a comma, and the answers are written as JSON lines in the same order. A name must
+be the exact name of exactly one person, unless --guess-names is given, which
+resolves names to the best match of the name index instead. Every answer carries
+the ids and names of the people it was resolved to. Queries that
+share a source reuse one breadth-first search tree, and the most recently used
+trees are kept in an LRU cache bounded by their memory. A tree keeps one 4 byte
+parent per person in the graph.
+
+Usage: python batch.py [--cache-mb N] [--guess-names] directory [queries]
+"""
+import json
+import sys
+from array import array
+from collections import OrderedDict, deque
+
+import degrees
+
+# how many megabytes of BFS trees are kept between queries
+DEFAULT_CACHE_MB = 256
+
+
+class BFSTree():
+    """
+    A breadth-first search tree from one source over the graph.
+
+    The tree is grown lazily: it only explores as far as the targets asked so far,
+    and later queries resume the search where the previous one stopped.
+    """
+    def __init__(self, graph, source):
+        self.graph = graph
+        self.source = source
+        # parent[p] is the person p was reached from, -1 until p has been reached;
+        # the movie they share is found again when a path is built
+        self.parent = array("i", [-1]) * graph.person_count()
+        # mark the source as reached, its parent is never followed
+        self.parent[source] = source
+        self.queue = deque([source])
+
+    def reached(self, person):
+        return self.parent[person] != -1
+
+    def nbytes(self):
+        return self.parent.itemsize * len(self.parent)
+
+    def grow_until(self, target):
+        """
+        Explores the graph until the target is reached or nothing is left to explore.
+        """
+        graph = self.graph
+        (person_starts, person_ends, person_movies,
+         movie_starts, movie_ends, movie_people) = graph.arrays()
+        parent = self.parent
+        queue = self.queue
+
+        while parent[target] == -1 and queue:
+            person = queue.popleft()
+            for i in range(person_starts[person], person_ends[person]):
+                movie = person_movies[i]
+                for j in range(movie_starts[movie], movie_ends[movie]):
+                    neighbor = movie_people[j]
+                    if parent[neighbor] == -1:
+                        parent[neighbor] = person
+                        queue.append(neighbor)
+
+    def path_to(self, target):
+        """
+        Returns the shortest list of (movie, person) index pairs from the source
+        to the target, or None if they are not connected.
+        """
+        self.grow_until(target)
+        if not self.reached(target):
+            return None
+        path = []
+        person = target
+        while person != self.source:
+            previous = self.parent[person]
+            path.append((self.shared_movie(previous, person), person))
+            person = previous
+        path.reverse()
+        return path
+
+    def shared_movie(self, person, neighbor):
+        """
+        Returns the first movie of the person that the neighbor starred in too,
+        the one the search reached the neighbor through.
+        """
+        movies = set(self.graph.movies_of(neighbor))
+        for movie in self.graph.movies_of(person):
+            if movie in movies:
+                return movie
+
+
+class TreeCache():
+    """
+    A least recently used cache of BFS trees keyed by their source, holding at most
+    max_bytes of trees but always the one in use.
+    """
+    def __init__(self, graph, max_bytes=DEFAULT_CACHE_MB << 20, components=None):
+        self.graph = graph
+        self.components = components
+        self.max_bytes = max_bytes
+        self.trees = OrderedDict()
+        self.nbytes = 0
+        self.queries = 0
+        self.hits = 0
+        self.misses = 0
+
+    def tree(self, source):
+        tree = self.trees.get(source)
+        if tree is not None:
+            self.hits += 1
+            self.trees.move_to_end(source)
+            return tree
+
+        self.misses += 1
+        tree = BFSTree(self.graph, source)
+        self.trees[source] = tree
+        self.nbytes += tree.nbytes()
+        while len(self.trees) > 1 and self.nbytes > self.max_bytes:
+            _, evicted = self.trees.popitem(last=False)
+            self.nbytes -= evicted.nbytes()
+        return tree
+
+    def shortest_path(self, source_id, target_id):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs that connect
+        the source to the target, or None if they are not connected.
+        """
+        self.queries += 1
+        graph = self.graph
+        source = graph.person_index[source_id]
+        target = graph.person_index[target_id]
+
+        # answer disconnected pairs without growing a tree
+        if self.components is not None and not self.components.connected(source, target):
+            return None
+        path = self.tree(source).path_to(target)
+        if path is None:
+            return None
+        return [(graph.movie_ids[movie], graph.person_ids[person]) for movie, person in path]
+
+
+def resolve(person, guess=False):
+    """
+    Returns (person_id, None) for an id or the exact name of exactly one person,
+    or (None, error). With guess, names resolve to the best match of the name index.
+    """
+    if person in degrees.people:
+        return person, None
+    if guess:
+        person_id = degrees.person_id_for_name(person, interactive=False)
+        return (person_id, None) if person_id is not None else (None, "person not found")
+    person_ids = degrees.get_name_index().exact(person)
+    if not person_ids:
+        return None, "person not found"
+    if len(person_ids) > 1:
+        return None, f"{len(person_ids)} people have this name, use an id"
+    return person_ids[0], None
+
+
+def answer(cache, line, guess=False):
+    """
+    Returns the JSON-serializable answer to one query line.
+    """
+    fields = line.split("\t") if "\t" in line else line.split(",")
+    if len(fields) != 2:
+        return {"query": line, "error": "expected a source and a target"}
+
+    source, target = (field.strip() for field in fields)
+    response = {"source": source, "target": target}
+    errors = []
+    for side, person in (("source", source), ("target", target)):
+        person_id, error = resolve(person, guess)
+        if error is not None:
+            errors.append(f"{side}: {error}")
+            continue
+        response[f"{side}_id"] = person_id
+        response[f"{side}_name"] = degrees.people[person_id]["name"]
+    if errors:
+        response["error"] = "; ".join(errors)
+        return response
+    source_id, target_id = response["source_id"], response["target_id"]
+
+    path = cache.shortest_path(source_id, target_id)
+    if path is None:
+        response["degrees"] = None
+        response["path"] = None
+    else:
+        response["degrees"] = len(path)
+        response["path"] = [{"movie": movie_id, "person": person_id} for movie_id, person_id in path]
+    return response
+
+
+def run(lines, output, cache, guess=False):
+    """
+    Writes one JSON line to the output for every non-empty query line.
+    """
+    for line in lines:
+        line = line.strip()
+        if line:
+            output.write(json.dumps(answer(cache, line, guess)) + "\n")
+
+
+def main():
+    args = sys.argv[1:]
+    megabytes = DEFAULT_CACHE_MB
+    if len(args) >= 2 and args[0] == "--cache-mb":
+        megabytes = int(args[1])
+        args = args[2:]
+    guess = "--guess-names" in args
+    if guess:
+        args.remove("--guess-names")
+    if len(args) not in (1, 2):
+        sys.exit("Usage: python batch.py [--cache-mb N] [--guess-names] directory [queries]")
+
+    degrees.load_data(args[0])
+    cache = TreeCache(degrees.graph, megabytes << 20, degrees.components)
+
+    if len(args) == 2:
+        with open(args[1], encoding="utf-8") as f:
+            run(f, sys.stdout, cache, guess)
+    else:
+        run(sys.stdin, sys.stdout, cache, guess)
+    print(f"{cache.misses} searches for {cache.queries} queries", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
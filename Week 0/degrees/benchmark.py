@@ -0,0 +1,192 @@
+"""
+A benchmark for degrees on synthetic, IMDB shaped datasets.
+
+For every requested size (in star rows) a dataset is generated with a long tailed
+cast size per movie and a long tailed number of movies per person, like the real
+data. Each dataset is then measured in a fresh process: load time, peak resident
+memory and the p50/p99 latency of shortest path queries for each search engine.
+The results are printed, or written to a file, as JSON.
+
+Usage: python benchmark.py [--sizes 10000,100000] [--queries N] [--engines bidirectional,alt,batch]
+                           [--workdir DIRECTORY] [--output FILE] [--seed N]
+"""
+import csv
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+DEFAULT_SIZES = [10000, 100000]
+DEFAULT_QUERIES = 200
+DEFAULT_ENGINES = ["bidirectional", "alt", "batch"]
+ENGINES = ["bidirectional", "alt", "batch", "dfs"]
+
+# the shape of the real dataset: stars per movie and stars per person on average
+STARS_PER_MOVIE = 3.0
+STARS_PER_PERSON = 1.8
+
+FIRST_NAMES = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "William",
+               "Elizabeth", "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah",
+               "Charles", "Karen", "Kevin", "Emma", "Tom", "Sally", "Gary", "Meg", "Jack", "Bill"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez",
+              "Martinez", "Hernandez", "Lopez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson",
+              "Martin", "Lee", "Bacon", "Hanks", "Cruise", "Ryan", "Sinise", "Paxton", "Nicholson", "Field"]
+WORDS = ["Night", "Return", "Love", "War", "Last", "City", "Dream", "Secret", "Shadow", "River", "Story",
+         "King", "Blood", "House", "Girl", "Man", "Summer", "Dark", "Little", "Lost", "Good", "Apollo"]
+
+
+def generate(directory, stars, seed=0):
+    """
+    Writes people.csv, movies.csv and stars.csv with about `stars` star rows to the directory.
+    """
+    rng = random.Random(seed)
+    movie_count = max(1, int(stars / STARS_PER_MOVIE))
+    person_count = max(2, int(stars / STARS_PER_PERSON))
+    os.makedirs(directory, exist_ok=True)
+
+    with open(f"{directory}/people.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC)
+        writer.writerow(["id", "name", "birth"])
+        for person in range(person_count):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            birth = str(rng.randint(1900, 2005)) if rng.random() < 0.7 else ""
+            writer.writerow([person + 1, name, birth])
+
+    with open(f"{directory}/movies.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC)
+        writer.writerow(["id", "title", "year"])
+        for movie in range(movie_count):
+            title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))
+            writer.writerow([movie + 1, title, rng.randint(1920, 2023)])
+
+    with open(f"{directory}/stars.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        written = 0
+        while written < stars:
+            movie = rng.randrange(movie_count)
+            # most movies list a handful of stars, a few list dozens
+            cast = min(stars - written, max(1, int(rng.paretovariate(2.0) * STARS_PER_MOVIE / 2)))
+            for _ in range(cast):
+                # a few prolific people appear in many movies, most in one or two
+                person = int(person_count * rng.random() ** 3)
+                writer.writerow([person + 1, movie + 1])
+            written += cast
+
+
+def percentile(values, q):
+    """
+    Returns the q-th percentile of the values by the nearest rank method.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(q * len(values) + 0.5)) - 1))]
+
+
+def measure(directory, engines, queries, seed):
+    """
+    Loads the dataset in this process and returns its measurements.
+    Meant to run in a fresh process, so peak memory is only this dataset's.
+    """
+    import batch
+    import degrees
+    from landmarks import LandmarkIndex
+
+    start = time.perf_counter()
+    degrees.load_data(directory)
+    results = {
+        "directory": directory,
+        "people": degrees.graph.person_count(),
+        "movies": degrees.graph.movie_count(),
+        "stars": len(degrees.graph.person_movies),
+        "load_seconds": time.perf_counter() - start,
+        "load_peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "engines": {},
+    }
+
+    # query random pairs of people who starred in something
+    rng = random.Random(seed)
+    graph = degrees.graph
+    actors = [person for person in range(graph.person_count()) if graph.filmography_size(person) > 0]
+    pairs = [(graph.person_ids[rng.choice(actors)], graph.person_ids[rng.choice(actors)]) for _ in range(queries)]
+
+    for engine in engines:
+        setup_start = time.perf_counter()
+        if engine == "alt":
+            degrees.landmarks = LandmarkIndex.build(graph)
+            search = degrees.ALT_search
+        elif engine == "batch":
+            search = batch.TreeCache(graph, components=degrees.components).shortest_path
+        elif engine == "dfs":
+            search = degrees.DFS
+        else:
+            search = degrees.bidirectional_BFS
+        setup_seconds = time.perf_counter() - setup_start
+
+        latencies = []
+        connected = 0
+        for source, target in pairs:
+            query_start = time.perf_counter()
+            path = search(source, target)
+            latencies.append((time.perf_counter() - query_start) * 1000)
+            connected += path is not None
+        results["engines"][engine] = {
+            "setup_seconds": setup_seconds,
+            "queries": len(pairs),
+            "connected": connected,
+            "p50_ms": percentile(latencies, 0.5),
+            "p99_ms": percentile(latencies, 0.99),
+            "mean_ms": sum(latencies) / len(latencies) if latencies else None,
+        }
+    results["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return results
+
+
+def main():
+    args = sys.argv[1:]
+
+    # the parent runs every measurement in a child process with this hidden command
+    if args and args[0] == "--measure":
+        directory, engines, queries, seed = args[1], args[2].split(","), int(args[3]), int(args[4])
+        print(json.dumps(measure(directory, engines, queries, seed)))
+        return
+
+    if len(args) % 2 != 0:
+        sys.exit(__doc__.split("\n\n")[-1].strip())
+    options = dict(zip(args[::2], args[1::2]))
+    sizes = [int(size) for size in options.get("--sizes", ",".join(map(str, DEFAULT_SIZES))).split(",")]
+    queries = int(options.get("--queries", DEFAULT_QUERIES))
+    engines = options.get("--engines", ",".join(DEFAULT_ENGINES)).split(",")
+    workdir = options.get("--workdir", "benchmark_data")
+    seed = int(options.get("--seed", 0))
+    for engine in engines:
+        if engine not in ENGINES:
+            sys.exit(f"Unknown engine {engine}, expected one of {', '.join(ENGINES)}")
+
+    results = []
+    for size in sizes:
+        directory = f"{workdir}/{size}"
+        if not os.path.exists(f"{directory}/stars.csv"):
+            print(f"Generating {size} star rows...", file=sys.stderr)
+            generate(directory, size, seed)
+        print(f"Measuring {directory}...", file=sys.stderr)
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--measure", directory, ",".join(engines), str(queries), str(seed)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.append(dict(json.loads(output), size=size))
+
+    report = json.dumps({"seed": seed, "results": results}, indent=2)
+    if "--output" in options:
+        with open(options["--output"], "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
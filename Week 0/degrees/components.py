@@ -0,0 +1,159 @@
+"""
+Connected components of the people graph.
+
+Two people are in the same component if a chain of shared movies connects them.
+The components are found with union-find over the star relation, so checking
+whether two people are connected at all is a single array comparison.
+
+New edges can join components after the labels are built. Instead of relabeling
+everyone, the joined labels are linked in a small union-find over labels, so an
+update costs time proportional to the number of new edges. The labels and sizes
+may be read only views of a snapshot, so new people and changed sizes are kept
+beside them rather than copying them.
+"""
+from array import array
+
+
+class Components():
+    def __init__(self, labels, sizes):
+        # labels[p] is the component of person p, sizes[c] the number of people in c
+        self.labels = labels
+        self.sizes = sizes
+        # maps a label that was joined into another component to that component's label
+        self.merged = {}
+        # labels of the people added by updates, and sizes changed or added by them
+        self.added = array("i")
+        self.changed_sizes = {}
+        self.label_count = len(sizes)
+
+    @classmethod
+    def build(cls, graph):
+        """
+        Labels the people of the graph by joining the stars of every movie.
+        """
+        count = graph.person_count()
+        parent = array("i", range(count))
+        size = array("q", [1]) * count
+
+        def find(person):
+            # follow the parents to the root, halving the path on the way
+            while parent[person] != person:
+                parent[person] = parent[parent[person]]
+                person = parent[person]
+            return person
+
+        movie_starts = graph.movie_starts
+        movie_ends = graph.movie_ends
+        movie_people = graph.movie_people
+        for movie in range(graph.movie_count()):
+            start, end = movie_starts[movie], movie_ends[movie]
+            if end - start < 2:
+                continue
+            root = find(movie_people[start])
+            for i in range(start + 1, end):
+                other = find(movie_people[i])
+                if other == root:
+                    continue
+                # hang the smaller tree below the larger one
+                if size[other] > size[root]:
+                    root, other = other, root
+                parent[other] = root
+                size[root] += size[other]
+
+        # number the roots densely, in order of first appearance
+        labels = array("i", [0]) * count
+        sizes = array("q")
+        numbers = {}
+        for person in range(count):
+            root = find(person)
+            if root not in numbers:
+                numbers[root] = len(sizes)
+                sizes.append(size[root])
+            labels[person] = numbers[root]
+        return cls(labels, sizes)
+
+    def component(self, person):
+        """
+        Returns the label of the component the person index is in now.
+        """
+        labels = self.labels
+        label = labels[person] if person < len(labels) else self.added[person - len(labels)]
+        merged = self.merged
+        while label in merged:
+            label = merged[label]
+        return label
+
+    def connected(self, source, target):
+        """
+        Returns True if there is a path between the two person indexes.
+        """
+        if not self.merged and not self.added:
+            return self.labels[source] == self.labels[target]
+        return self.component(source) == self.component(target)
+
+    def size_of(self, person):
+        """
+        Returns the number of people in the component of the person index.
+        """
+        return self.size(self.component(person))
+
+    def size(self, label):
+        size = self.changed_sizes.get(label)
+        return self.sizes[label] if size is None else size
+
+    def count(self):
+        return self.label_count - len(self.merged)
+
+    def update(self, graph, edges):
+        """
+        Labels the people added to the graph since the last update and joins
+        the components connected by the new (person, movie) edges.
+        """
+        # new people start out alone
+        for _ in range(len(self.labels) + len(self.added), graph.person_count()):
+            self.added.append(self.label_count)
+            self.changed_sizes[self.label_count] = 1
+            self.label_count += 1
+
+        for person, movie in edges:
+            # the other stars of the movie already share one component
+            for other in graph.stars_of(movie):
+                if other != person:
+                    self.join(self.component(person), self.component(other))
+                    break
+
+    def join(self, label, other):
+        """
+        Joins two components, linking the smaller label into the larger one.
+        """
+        if label == other:
+            return
+        if self.size(label) < self.size(other):
+            label, other = other, label
+        self.merged[other] = label
+        self.changed_sizes[label] = self.size(label) + self.size(other)
+
+    def sections(self):
+        # number the components densely again, so the snapshot needs no merge table
+        if self.merged or self.added or self.changed_sizes:
+            count = len(self.labels) + len(self.added)
+            numbers = {}
+            sizes = array("q")
+            labels = array("i", [0]) * count
+            for person in range(count):
+                label = self.component(person)
+                if label not in numbers:
+                    numbers[label] = len(sizes)
+                    sizes.append(self.size(label))
+                labels[person] = numbers[label]
+            self.__init__(labels, sizes)
+        return {"components.labels": self.labels, "components.sizes": self.sizes}
+
+    @classmethod
+    def from_sections(cls, sections):
+        """
+        Returns the components stored in a snapshot, or None if it has none.
+        """
+        if "components.labels" not in sections:
+            return None
+        return cls(sections["components.labels"], sections["components.sizes"])
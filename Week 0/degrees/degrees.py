@@ -2,63 +2,306 @@
 IMPORTANT INFORMATION!
 I wrote only the util.py and DFS function in this program. The rest of the code was created by CS50 AI
 """
-import csv
+import heapq
+import math
+import os
+import shutil
 import sys
+import time
 
-from util import Node, StackFrontier, QueueFrontier
+from components import Components
+from graph import Graph
+from ingest import CODED, TEXT, decode_coded, decode_text, read_table, report
+from landmarks import load_index
+from metadata import CodedColumn, NameMap, StringColumn, Table
+from nameindex import NameIndex
+from paths import ShortestPaths
+from queries import PathQuery
+from snapshot import SnapshotError, is_fresh, read_snapshot, write_snapshot
+from util import Node, SearchStats, StackFrontier, QueueFrontier
 
-# Maps names to a set of corresponding person_ids
-names = {}
+# Integer-indexed star relation between people and movies
+graph = Graph()
 
-# Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
-people = {}
+# Maps person_ids to a record of: name, birth
+people = Table(graph, "person", {"name": StringColumn, "birth": CodedColumn})
 
-# Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
-movies = {}
+# Maps movie_ids to a record of: title, year
+movies = Table(graph, "movie", {"title": StringColumn, "year": CodedColumn})
 
+# Maps names to a set of corresponding person_ids, built the first time it is needed
+names = NameMap(people)
 
-def load_data(directory):
+# Connected component label of every person, computed when the data is loaded
+components = None
+
+# Name index for prefix and fuzzy lookups, built the first time it is needed
+name_index = None
+
+# Optional landmark distance index, for distance bounds and opt-in A* searches
+landmarks = None
+
+# The CSV files of a dataset directory and the name of its binary snapshot
+CSV_FILES = ["people.csv", "movies.csv", "stars.csv"]
+SNAPSHOT_FILE = "degrees.snapshot"
+
+# Deltas appended to a dataset are kept in numbered directories under this one
+UPDATES_DIRECTORY = "updates"
+
+# How many people a search expands between checks of its deadline
+DEADLINE_INTERVAL = 1024
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def load_data(directory, workers=None, verbose=False):
+    """
+    Load data from CSV files into memory,
+    or from the directory's snapshot if it is newer than the CSV files.
+    Then replays the deltas recorded by append_to_dataset, and loads the
+    directory's landmark index if there is an up to date one.
+
+    The CSV files are parsed in chunks by up to `workers` processes.
+    """
+    global components, landmarks, name_index
+
+    components = None
+    name_index = None
+    names.clear()
+
+    sources = [f"{directory}/{name}" for name in CSV_FILES]
+    snapshot = f"{directory}/{SNAPSHOT_FILE}"
+    try:
+        if not is_fresh(snapshot, sources):
+            raise SnapshotError(f"{snapshot} is missing or out of date")
+        load_cache(snapshot)
+    except SnapshotError:
+        # fall back to the CSV files if the snapshot is stale or from another version
+        load_csv(directory, workers, verbose)
+
+    # label the connected components unless the snapshot already had them
+    if components is None:
+        components = Components.build(graph)
+
+    # replaying a delta the snapshot already has changes nothing
+    deltas = recorded_deltas(directory)
+    for delta in deltas:
+        append_data(delta)
+    landmarks = load_index(directory, sources + deltas, graph.person_count())
+
+
+def load_worker(directory):
     """
-    Load data from CSV files into memory.
+    Loads the dataset in a pool worker, unless it was inherited from the parent.
     """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
+    if graph.person_count() == 0:
+        load_data(directory)
+
+
+def load_csv(directory, workers=None, verbose=False):
+    """
+    Load data from the CSV files of the directory into memory.
+    """
+    # Load people, with names and births encoded by the parsing workers
+    path = f"{directory}/people.csv"
+    (person_ids, person_names, births), rows, seconds = read_table(
+        path, ["id", "name", "birth"], workers, {"name": TEXT, "birth": CODED})
+    start = time.perf_counter()
+    if graph.extend_people(person_ids):
+        people.extend({"name": person_names, "birth": births})
+    else:
+        # repeated ids keep their first index and their last record, one row at a time
+        for person_id, name, birth in zip(person_ids, decode_text(person_names), decode_coded(births)):
+            graph.add_person(person_id)
+            people[person_id] = {
+                "name": name,
+                "birth": birth
             }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
+    if verbose:
+        print(report(path, rows, seconds, time.perf_counter() - start))
 
     # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
+    path = f"{directory}/movies.csv"
+    (movie_ids, titles, years), rows, seconds = read_table(
+        path, ["id", "title", "year"], workers, {"title": TEXT, "year": CODED})
+    start = time.perf_counter()
+    if graph.extend_movies(movie_ids):
+        movies.extend({"title": titles, "year": years})
+    else:
+        for movie_id, title, year in zip(movie_ids, decode_text(titles), decode_coded(years)):
+            graph.add_movie(movie_id)
+            movies[movie_id] = {
+                "title": title,
+                "year": year
             }
+    if verbose:
+        print(report(path, rows, seconds, time.perf_counter() - start))
 
     # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    path = f"{directory}/stars.csv"
+    (star_people, star_movies), rows, seconds = read_table(path, ["person_id", "movie_id"], workers)
+    start = time.perf_counter()
+    graph.add_stars(star_people, star_movies)
+
+    # Pack the star relation into its compact arrays
+    graph.freeze()
+    if verbose:
+        print(report(path, rows, seconds, time.perf_counter() - start))
+
+
+def append_data(directory):
+    """
+    Applies the delta CSV files of the directory (any of people.csv, movies.csv
+    and stars.csv) to the loaded data, in time proportional to the delta.
+
+    Returns the number of new people, movies and stars, not counting the rows
+    that only update a person or movie already there.
+    """
+    global landmarks
+
+    person_count = graph.person_count()
+    movie_count = graph.movie_count()
+
+    # Add or rename people
+    path = f"{directory}/people.csv"
+    if os.path.exists(path):
+        (person_ids, person_names, births), _, _ = read_table(path, ["id", "name", "birth"], 1)
+        for person_id, name, birth in zip(person_ids, person_names, births):
+            if person_id in people:
+                names.discard(people[person_id]["name"], person_id)
+            graph.add_person(person_id)
+            people[person_id] = {
+                "name": name,
+                "birth": birth
+            }
+            names.add(name, person_id)
+            if name_index is not None:
+                name_index.add(name)
+
+    # Add or rename movies
+    path = f"{directory}/movies.csv"
+    if os.path.exists(path):
+        (movie_ids, titles, years), _, _ = read_table(path, ["id", "title", "year"], 1)
+        for movie_id, title, year in zip(movie_ids, titles, years):
+            graph.add_movie(movie_id)
+            movies[movie_id] = {
+                "title": title,
+                "year": year
+            }
+
+    # Add stars
+    path = f"{directory}/stars.csv"
+    if os.path.exists(path):
+        (star_people, star_movies), _, _ = read_table(path, ["person_id", "movie_id"], 1)
+        for person_id, movie_id in zip(star_people, star_movies):
+            graph.add_star(person_id, movie_id)
+    edges = graph.patch()
+
+    # keep the components up to date, but new edges can shorten any landmark distance
+    components.update(graph, edges)
+    if edges:
+        landmarks = None
+    return graph.person_count() - person_count, graph.movie_count() - movie_count, len(edges)
+
+
+def append_to_dataset(delta, directory):
+    """
+    Records a delta directory in the dataset's updates, so load_data applies it from now on.
+    Returns the directory the delta was copied to.
+    """
+    updates = f"{directory}/{UPDATES_DIRECTORY}"
+    os.makedirs(updates, exist_ok=True)
+    target = f"{updates}/{len(recorded_deltas(directory)) + 1:06d}"
+    os.makedirs(target)
+    for name in CSV_FILES:
+        if os.path.exists(f"{delta}/{name}"):
+            shutil.copy(f"{delta}/{name}", f"{target}/{name}")
+    return target
+
+
+def recorded_deltas(directory):
+    """
+    Returns the delta directories recorded for the dataset, oldest first.
+    """
+    updates = f"{directory}/{UPDATES_DIRECTORY}"
+    if not os.path.isdir(updates):
+        return []
+    return [f"{updates}/{name}" for name in sorted(os.listdir(updates))]
+
+
+def build_cache(directory):
+    """
+    Loads the CSV files of the directory and writes them to its snapshot.
+    """
+    # remove the old snapshot so load_data reads the CSV files
+    if os.path.exists(f"{directory}/{SNAPSHOT_FILE}"):
+        os.remove(f"{directory}/{SNAPSHOT_FILE}")
+    load_data(directory, verbose=True)
+    save_cache(f"{directory}/{SNAPSHOT_FILE}")
+
+
+def save_cache(path):
+    """
+    Writes the loaded data to a binary snapshot file.
+    """
+    sections = people.sections("people")
+    sections.update(movies.sections("movies"))
+    sections.update(graph.sections())
+    sections.update(components.sections())
+    write_snapshot(path, sections)
+
+
+def load_cache(path):
+    """
+    Loads the data from a binary snapshot file written by save_cache.
+    """
+    global components
+
+    sections = read_snapshot(path)
+
+    # the ids, the star relation and the metadata columns are used straight from the memory map
+    try:
+        graph.load_sections(sections)
+        people.load_sections(sections, "people")
+        movies.load_sections(sections, "movies")
+    except KeyError as error:
+        # start the CSV fallback from empty tables
+        graph.__init__()
+        people.clear()
+        movies.clear()
+        raise SnapshotError(f"{path} has no {error} section") from error
+    components = Components.from_sections(sections)
 
 
 def main():
+    # --stats prints what the search did as a JSON line on stderr
+    show_stats = "--stats" in sys.argv
+    if show_stats:
+        sys.argv.remove("--stats")
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--build-cache":
+        if len(sys.argv) > 3:
+            sys.exit("Usage: python degrees.py --build-cache [directory]")
+        directory = sys.argv[2] if len(sys.argv) == 3 else "large"
+        print("Building cache...")
+        build_cache(directory)
+        print(f"Cache written to {directory}/{SNAPSHOT_FILE}.")
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--append":
+        if len(sys.argv) not in (3, 4):
+            sys.exit("Usage: python degrees.py --append delta_directory [directory]")
+        directory = sys.argv[3] if len(sys.argv) == 4 else "large"
+        load_data(directory)
+        added = append_data(sys.argv[2])
+        target = append_to_dataset(sys.argv[2], directory)
+        print(f"Added {added[0]} people, {added[1]} movies and {added[2]} stars, recorded in {target}.")
+        return
+
     if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
+        sys.exit("Usage: python degrees.py [--build-cache | --append delta_directory | --stats] [directory]")
     directory = sys.argv[1] if len(sys.argv) == 2 else "large"
 
     # Load data from files into memory
@@ -73,10 +316,14 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    stats = SearchStats() if show_stats else None
+    path = shortest_path(source, target, stats)
+    if stats is not None:
+        stats.log()
 
     if path is None:
         print("Not connected.")
+        print(f"Component sizes: {component_size(source)} and {component_size(target)} people.")
     else:
         degrees = len(path)
         print(f"{degrees} degrees of separation.")
@@ -88,30 +335,260 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, stats=None, use_landmarks=False, deadline=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    If no possible path, returns None.
+    If a SearchStats object is given, it is filled in with what the search did.
+    With use_landmarks, the landmark index guides an A* search instead of the
+    bidirectional search, which is usually slower on this small-world graph.
+    If a deadline (a time.time() value) is given, the search raises SearchTimeout
+    once it passes, so callers in other processes can stop it.
+    """
+    if stats is not None:
+        stats.phase("setup")
+
+    # people in different components are never connected
+    if not components.connected(graph.person_index[source], graph.person_index[target]):
+        if stats is not None:
+            stats.search = "components"
+            stats.finish()
+        return None
+
+    if use_landmarks and landmarks is not None:
+        path = ALT_search(source, target, stats)
+    # otherwise return the shortest path using bidirectional breadth-first search
+    else:
+        path = bidirectional_BFS(source, target, stats, deadline)
+
+    if stats is not None:
+        stats.finish()
+    return path
+
+def distance_bounds(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation between two people
+    from the landmark index, without searching. The lower bound is math.inf if
+    they are not connected. Without an index the bounds are 0 and math.inf.
+    """
+    if landmarks is None:
+        return 0, math.inf
+    return landmarks.bounds(graph.person_index[source], graph.person_index[target])
+
+def constrained_path(source, target, min_year=None, max_year=None, exclude_people=(), exclude_movies=(),
+                     weight=None, min_weight=None):
+    """
+    Returns the cheapest list of (movie_id, person_id) pairs that connect the
+    source to the target using only movies from min_year to max_year, and none of
+    the excluded people or movies. See queries.PathQuery for weight and min_weight.
+
+    If no possible path, returns None.
+    """
+    if not components.connected(graph.person_index[source], graph.person_index[target]):
+        return None
+    query = PathQuery(graph, movies, min_year, max_year, exclude_people, exclude_movies, weight, min_weight)
+    found = query.shortest_path(source, target, landmarks)
+    return None if found is None else found[1]
+
+def count_shortest_paths(source, target):
+    """
+    Returns the number of distinct shortest lists of (movie_id, person_id) pairs
+    that connect the source to the target, 0 if they are not connected.
+    """
+    if not components.connected(graph.person_index[source], graph.person_index[target]):
+        return 0
+    return ShortestPaths(graph, graph.person_index[source], graph.person_index[target]).total()
+
+def all_shortest_paths(source, target, limit=None):
+    """
+    Yields up to `limit` distinct shortest lists of (movie_id, person_id) pairs
+    that connect the source to the target, generating them one at a time.
+    """
+    if not components.connected(graph.person_index[source], graph.person_index[target]):
+        return
+    search = ShortestPaths(graph, graph.person_index[source], graph.person_index[target])
+    for path in search.paths(limit):
+        yield [(graph.movie_ids[movie], graph.person_ids[person]) for movie, person in path]
+
+def ALT_search(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs that connect the
+    source to the target, using A* with the landmark bounds as its heuristic.
+
     If no possible path, returns None.
     """
-    # return the shortest path using deep-first search
-    return DFS(source, target)
+    if stats is not None:
+        stats.search = "alt"
+    if source == target:
+        return []
+    source = graph.person_index[source]
+    target = graph.person_index[target]
 
-def DFS(source, target):
+    # the landmarks can prove that two people are not connected without searching
+    lower, _ = landmarks.bounds(source, target)
+    if lower == math.inf:
+        return None
+    estimate = landmarks.heuristic(target)
+
+    (person_starts, person_ends, person_movies,
+     movie_starts, movie_ends, movie_people) = graph.arrays()
+
+    # maps a reached person to its distance and the (movie, person) it was reached from
+    distance = {source: 0}
+    parents = {source: None}
+    frontier = [(lower, 0, source)]
+    if stats is not None:
+        stats.phase("search")
+    while frontier:
+        _, cost, person = heapq.heappop(frontier)
+        if person == target:
+            if stats is not None:
+                stats.visited = len(distance)
+                stats.phase("reconstruct")
+            return join_paths(target, parents, {target: None})
+        # skip people that were reached again by a shorter path
+        if cost > distance[person]:
+            continue
+        if stats is not None:
+            stats.nodes_expanded += 1
+            stats.neighbor_calls += person_ends[person] - person_starts[person]
+            stats.observe_frontier(len(frontier))
+        for i in range(person_starts[person], person_ends[person]):
+            movie = person_movies[i]
+            for j in range(movie_starts[movie], movie_ends[movie]):
+                neighbor = movie_people[j]
+                if neighbor not in distance or cost + 1 < distance[neighbor]:
+                    distance[neighbor] = cost + 1
+                    parents[neighbor] = (movie, person)
+                    heapq.heappush(frontier, (cost + 1 + estimate(neighbor), cost + 1, neighbor))
+    if stats is not None:
+        stats.visited = len(distance)
+    return None
+
+def bidirectional_BFS(source, target, stats=None, deadline=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs that connect the
+    source to the target, searching from both ends one layer at a time.
+
+    If no possible path, returns None.
+    """
+    if stats is not None:
+        stats.search = "bidirectional"
+    if source == target:
+        return []
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+
+    # each side maps a visited person to the (movie, person) it was reached from
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+    if stats is not None:
+        stats.phase("search")
+
+    while forward_frontier and backward_frontier:
+        if stats is not None:
+            stats.observe_frontier(len(forward_frontier) + len(backward_frontier))
+
+        # always grow the smaller side, so both searches stay as shallow as possible
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = expand_layer(forward_frontier, forward, backward, stats, deadline)
+        else:
+            backward_frontier, meeting = expand_layer(backward_frontier, backward, forward, stats, deadline)
+
+        # the first person seen by both sides lies on a shortest path
+        if meeting is not None:
+            if stats is not None:
+                stats.visited = len(forward) + len(backward)
+                stats.phase("reconstruct")
+            return join_paths(meeting, forward, backward)
+
+    # one side ran out of people to explore, so there is no connection
+    if stats is not None:
+        stats.visited = len(forward) + len(backward)
+    return None
+
+def expand_layer(frontier, visited, other_visited, stats=None, deadline=None):
+    """
+    Explores every person in the frontier once and returns the next layer,
+    together with the first person already visited by the other side (or None).
+    Raises SearchTimeout if the deadline passes.
+    """
+    (person_starts, person_ends, person_movies,
+     movie_starts, movie_ends, movie_people) = graph.arrays()
+
+    next_frontier = []
+    for count, person in enumerate(frontier):
+        if deadline is not None and count % DEADLINE_INTERVAL == 0 and time.time() > deadline:
+            raise SearchTimeout()
+        for i in range(person_starts[person], person_ends[person]):
+            movie = person_movies[i]
+            for j in range(movie_starts[movie], movie_ends[movie]):
+                neighbor = movie_people[j]
+                if neighbor in visited:
+                    continue
+                visited[neighbor] = (movie, person)
+                if neighbor in other_visited:
+                    if stats is not None:
+                        count_expansions(stats, frontier[:frontier.index(person) + 1])
+                    return next_frontier, neighbor
+                next_frontier.append(neighbor)
+    if stats is not None:
+        count_expansions(stats, frontier)
+    return next_frontier, None
+
+def count_expansions(stats, expanded):
+    """
+    Adds the people expanded in a layer, and the movie lists they scanned, to the stats.
+    """
+    stats.nodes_expanded += len(expanded)
+    stats.neighbor_calls += sum(graph.filmography_size(person) for person in expanded)
+
+def join_paths(meeting, forward, backward):
+    """
+    Returns the (movie_id, person_id) path through the meeting person by
+    following the parent pointers of both searches.
+    """
+    # walk back from the meeting person to the source
+    path = []
+    person = meeting
+    while forward[person] is not None:
+        movie, parent = forward[person]
+        path.append((movie, person))
+        person = parent
+    path.reverse()
+
+    # walk forward from the meeting person to the target
+    person = meeting
+    while backward[person] is not None:
+        movie, child = backward[person]
+        path.append((movie, child))
+        person = child
+
+    # translate the indexes back to IMDB ids
+    return [(graph.movie_ids[movie], graph.person_ids[person]) for movie, person in path]
+
+def DFS(source, target, stats=None):
     """
     Returns the shortest list using deep-first search of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
     """
+    if stats is not None:
+        stats.search = "dfs"
+        stats.phase("search")
+
     # if there is no neighbors to the target that means that there is no connection -> return None
     if len(neighbors_for_person(target)) == 0 and source != target:
         return None
     elif source == target:
         return []
 
-    frontier = StackFrontier()
+    frontier = StackFrontier(stats)
     node = Node()
 
     # an empty array to include the explored nodes
@@ -146,6 +623,9 @@ def DFS(source, target):
         # add the explored node to the explored set
         last_explored = frontier.show()[1]
         explored_set.append(last_explored)
+        if stats is not None:
+            stats.nodes_expanded += 1
+            stats.visited = len(explored_set)
 
         # remove the last node from the frontier
         frontier.remove()
@@ -172,13 +652,37 @@ def are_neighbors_explored(node, explored_set):
             return False
     return True
 
-def person_id_for_name(name):
+def component_size(person_id):
+    """
+    Returns the number of people connected to the person, including themselves.
+    """
+    return components.size_of(graph.person_index[person_id])
+
+def get_name_index():
+    """
+    Returns the name index, building it on first use.
+    """
+    global name_index
+    if name_index is None:
+        name_index = NameIndex(names, people, graph)
+    return name_index
+
+def person_id_for_name(name, interactive=True):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    When not interactive, ambiguities and typos are resolved without prompting,
+    by picking the best ranked match of the name index.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    if not interactive:
+        return get_name_index().best(name)
+
+    person_ids = get_name_index().exact(name)
     if len(person_ids) == 0:
+        suggestions = get_name_index().candidates(name, 5)
+        if suggestions:
+            print("Did you mean: " + ", ".join(people[person_id]["name"] for person_id in suggestions) + "?")
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
@@ -203,11 +707,9 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
     neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
+    for movie, person in graph.neighbors(graph.person_index[person_id]):
+        neighbors.add((graph.movie_ids[movie], graph.person_ids[person]))
     return neighbors
 
 
@@ -0,0 +1,419 @@
+"""
+A compact graph of people and movies.
+
+People and movies are given dense integer indexes and the star relation is stored
+twice, once per side, in CSR form: a flat array of indexes and, for every row, the
+start and end of its slice in that array. The movies of person p are
+person_movies[person_starts[p]:person_ends[p]] and the stars of movie m are
+movie_people[movie_starts[m]:movie_ends[m]].
+
+freeze() packs all rows back to back, so every row ends where the next one starts.
+patch() applies a few new edges by copying only the rows they touch to the end of
+the flat arrays, which keeps updates proportional to their size.
+
+A graph loaded from a snapshot keeps its IMDB ids in the memory map too: IdList
+decodes an id when it is read and IdIndex finds the index of an id by binary
+search over the indexes in id order, so loading builds no list or dictionary.
+"""
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+
+from snapshot import as_array
+
+# type codes for the flat index arrays and for the offset arrays
+INDEX = "i"
+OFFSET = "q"
+
+
+class Graph():
+    def __init__(self):
+        # map integer indexes to the IMDB ids and back
+        self.person_ids = []
+        self.movie_ids = []
+        self.person_index = {}
+        self.movie_index = {}
+
+        # the CSR arrays for both sides of the star relation
+        self.set_offsets(array(OFFSET, [0]), array(INDEX), array(OFFSET, [0]), array(INDEX))
+
+        # star edges added since the last call to freeze or patch
+        self.pending_people = array(INDEX)
+        self.pending_movies = array(INDEX)
+
+    def set_offsets(self, person_offsets, person_movies, movie_offsets, movie_people):
+        """
+        Uses packed CSR arrays as the graph, with the rows' starts and ends as views of the offsets.
+        """
+        self.person_offsets = person_offsets
+        self.movie_offsets = movie_offsets
+        self.person_starts = memoryview(person_offsets)[:-1]
+        self.person_ends = memoryview(person_offsets)[1:]
+        self.movie_starts = memoryview(movie_offsets)[:-1]
+        self.movie_ends = memoryview(movie_offsets)[1:]
+        self.person_movies = person_movies
+        self.movie_people = movie_people
+
+    def add_person(self, person_id):
+        """
+        Returns the index of the person, adding it to the graph if needed.
+        """
+        index = self.person_index.get(person_id)
+        if index is None:
+            index = len(self.person_ids)
+            self.person_index[person_id] = index
+            self.person_ids.append(person_id)
+        return index
+
+    def add_movie(self, movie_id):
+        """
+        Returns the index of the movie, adding it to the graph if needed.
+        """
+        index = self.movie_index.get(movie_id)
+        if index is None:
+            index = len(self.movie_ids)
+            self.movie_index[movie_id] = index
+            self.movie_ids.append(movie_id)
+        return index
+
+    def extend_people(self, person_ids):
+        """
+        Adds many new people at once. Returns False, without adding anyone, if an id
+        is repeated or already in the graph.
+        """
+        return extend_ids(self.person_ids, self.person_index, person_ids)
+
+    def extend_movies(self, movie_ids):
+        """
+        Adds many new movies at once. Returns False, without adding anything, if an id
+        is repeated or already in the graph.
+        """
+        return extend_ids(self.movie_ids, self.movie_index, movie_ids)
+
+    def add_stars(self, person_ids, movie_ids):
+        """
+        Records many star edges at once, skipping the ones with an unknown person or movie.
+        """
+        people = list(map(self.person_index.get, person_ids))
+        movies = list(map(self.movie_index.get, movie_ids))
+        if None in people or None in movies:
+            known = [i for i, (person, movie) in enumerate(zip(people, movies))
+                     if person is not None and movie is not None]
+            people = [people[i] for i in known]
+            movies = [movies[i] for i in known]
+        self.pending_people.extend(array(INDEX, people))
+        self.pending_movies.extend(array(INDEX, movies))
+
+    def add_star(self, person_id, movie_id):
+        """
+        Records that a known person starred in a known movie.
+        Returns False if either of them is unknown.
+        """
+        person = self.person_index.get(person_id)
+        movie = self.movie_index.get(movie_id)
+        if person is None or movie is None:
+            return False
+        self.pending_people.append(person)
+        self.pending_movies.append(movie)
+        return True
+
+    def freeze(self):
+        """
+        Rebuilds the packed CSR arrays so they include every star edge added so far.
+        """
+        # start from the edges that are already in the graph
+        people = array(INDEX)
+        movies = array(INDEX)
+        for person in range(len(self.person_starts)):
+            for i in range(self.person_starts[person], self.person_ends[person]):
+                people.append(person)
+                movies.append(self.person_movies[i])
+        people.extend(self.pending_people)
+        movies.extend(self.pending_movies)
+
+        person_offsets, person_movies = build_csr(len(self.person_ids), people, movies)
+        movie_offsets, movie_people = build_csr(len(self.movie_ids), movies, people)
+        self.set_offsets(person_offsets, person_movies, movie_offsets, movie_people)
+        self.pending_people = array(INDEX)
+        self.pending_movies = array(INDEX)
+
+    def patch(self):
+        """
+        Adds the people, movies and star edges recorded since the last freeze or patch,
+        in time proportional to the rows they touch. Returns the new (person, movie) edges.
+        """
+        # group the new edges by row, skipping the ones the graph already has
+        new_movies = {}
+        new_people = {}
+        edges = []
+        for person, movie in zip(self.pending_people, self.pending_movies):
+            if movie in new_movies.get(person, ()):
+                continue
+            if person < len(self.person_starts) and movie in self.movies_of(person):
+                continue
+            new_movies.setdefault(person, set()).add(movie)
+            new_people.setdefault(movie, set()).add(person)
+            edges.append((person, movie))
+        self.pending_people = array(INDEX)
+        self.pending_movies = array(INDEX)
+
+        # leave a memory mapped graph alone if nothing changed
+        if not edges and len(self.person_starts) == len(self.person_ids) and len(self.movie_starts) == len(self.movie_ids):
+            return edges
+        self.make_growable()
+
+        # new people and movies start out with empty rows
+        for _ in range(len(self.person_starts), len(self.person_ids)):
+            self.person_starts.append(0)
+            self.person_ends.append(0)
+        for _ in range(len(self.movie_starts), len(self.movie_ids)):
+            self.movie_starts.append(0)
+            self.movie_ends.append(0)
+
+        append_rows(self.person_starts, self.person_ends, self.person_movies, new_movies)
+        append_rows(self.movie_starts, self.movie_ends, self.movie_people, new_people)
+        return edges
+
+    def make_growable(self):
+        """
+        Copies the row starts and ends, and the flat arrays, into arrays of their own,
+        so they can grow even if they came from offsets or a memory map. The search
+        loops index these arrays directly, so they are copied whole, but as raw bytes.
+        """
+        if isinstance(self.person_starts, array):
+            return
+        self.person_starts = as_array(self.person_starts)
+        self.person_ends = as_array(self.person_ends)
+        self.movie_starts = as_array(self.movie_starts)
+        self.movie_ends = as_array(self.movie_ends)
+        self.person_movies = as_array(self.person_movies)
+        self.movie_people = as_array(self.movie_people)
+        self.person_offsets = None
+        self.movie_offsets = None
+
+    def sections(self):
+        """
+        Returns the arrays that make up the graph, keyed by snapshot section name.
+        """
+        # a patched graph is packed again, so the snapshot only stores offsets
+        if self.person_offsets is None:
+            self.freeze()
+        sections = {
+            "graph.person_offsets": self.person_offsets,
+            "graph.person_movies": self.person_movies,
+            "graph.movie_offsets": self.movie_offsets,
+            "graph.movie_people": self.movie_people,
+        }
+        sections.update(id_sections("graph.person_ids", self.person_ids))
+        sections.update(id_sections("graph.movie_ids", self.movie_ids))
+        return sections
+
+    def load_sections(self, sections):
+        """
+        Replaces the graph with the arrays of a snapshot, nothing is decoded.
+        """
+        self.person_ids = IdList(sections["graph.person_ids.data"], sections["graph.person_ids.ends"])
+        self.movie_ids = IdList(sections["graph.movie_ids.data"], sections["graph.movie_ids.ends"])
+        self.person_index = IdIndex(self.person_ids, sections["graph.person_ids.order"])
+        self.movie_index = IdIndex(self.movie_ids, sections["graph.movie_ids.order"])
+        self.set_offsets(sections["graph.person_offsets"], sections["graph.person_movies"],
+                         sections["graph.movie_offsets"], sections["graph.movie_people"])
+        self.pending_people = array(INDEX)
+        self.pending_movies = array(INDEX)
+
+    def arrays(self):
+        """
+        Returns the six CSR arrays, for search loops to keep in local variables:
+        (person_starts, person_ends, person_movies, movie_starts, movie_ends, movie_people).
+        """
+        return (self.person_starts, self.person_ends, self.person_movies,
+                self.movie_starts, self.movie_ends, self.movie_people)
+
+    def person_count(self):
+        return len(self.person_ids)
+
+    def movie_count(self):
+        return len(self.movie_ids)
+
+    def filmography_size(self, person):
+        """
+        Returns the number of movies the person starred in.
+        """
+        return self.person_ends[person] - self.person_starts[person]
+
+    def movies_of(self, person):
+        """
+        Returns the movie indexes the person starred in.
+        """
+        return self.person_movies[self.person_starts[person]:self.person_ends[person]]
+
+    def stars_of(self, movie):
+        """
+        Returns the person indexes who starred in the movie.
+        """
+        return self.movie_people[self.movie_starts[movie]:self.movie_ends[movie]]
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) index pairs for people who starred with the person.
+        """
+        (person_starts, person_ends, person_movies,
+         movie_starts, movie_ends, movie_people) = self.arrays()
+        for i in range(person_starts[person], person_ends[person]):
+            movie = person_movies[i]
+            for j in range(movie_starts[movie], movie_ends[movie]):
+                yield movie, movie_people[j]
+
+
+class IdList():
+    """
+    The ids of a snapshot graph by index, stored back to back as UTF-8 bytes with
+    the end of every id, used like the list of ids it replaces.
+    """
+    def __init__(self, data, ends):
+        self.data = data
+        self.ends = ends
+        # ids added after loading
+        self.added = []
+
+    def __len__(self):
+        return len(self.ends) + len(self.added)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if index >= len(self.ends):
+            return self.added[index - len(self.ends)]
+        return bytes(self.encoded(index)).decode("utf-8")
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def encoded(self, index):
+        return self.data[self.ends[index - 1] if index else 0:self.ends[index]]
+
+    def append(self, value):
+        self.added.append(value)
+
+    def extend(self, values):
+        self.added.extend(values)
+
+
+class IdIndex():
+    """
+    Maps the ids of an IdList to their indexes, used like the dictionary it replaces.
+    `order` holds the stored indexes sorted by id, ids added after loading are
+    kept in a dictionary.
+    """
+    def __init__(self, ids, order):
+        self.ids = ids
+        self.order = order
+        self.added = {}
+
+    def __len__(self):
+        return len(self.order) + len(self.added)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __getitem__(self, key):
+        index = self.get(key)
+        if index is None:
+            raise KeyError(key)
+        return index
+
+    def __setitem__(self, key, index):
+        self.added[key] = index
+
+    def update(self, mapping):
+        self.added.update(mapping)
+
+    def get(self, key, default=None):
+        index = self.added.get(key)
+        if index is not None:
+            return index
+        if not isinstance(key, str):
+            return default
+        # UTF-8 bytes sort like the strings they encode
+        target = key.encode("utf-8")
+        position = bisect_left(self.order, target, key=lambda index: bytes(self.ids.encoded(index)))
+        if position < len(self.order) and self.ids.encoded(self.order[position]) == target:
+            return self.order[position]
+        return default
+
+
+def id_sections(prefix, ids):
+    """
+    Returns the snapshot sections IdList and IdIndex are loaded from.
+    """
+    ids = list(ids)
+    encoded = [value.encode("utf-8") for value in ids]
+    return {
+        f"{prefix}.data": array("B", b"".join(encoded)),
+        f"{prefix}.ends": array(OFFSET, accumulate(map(len, encoded))),
+        f"{prefix}.order": array(INDEX, sorted(range(len(ids)), key=ids.__getitem__)),
+    }
+
+
+def extend_ids(ids, index, new_ids):
+    """
+    Appends new_ids to the ids list and their positions to the index,
+    unless one of them is repeated or already there. Returns whether they were added.
+    """
+    start = len(ids)
+    additions = dict(zip(new_ids, range(start, start + len(new_ids))))
+    if len(additions) != len(new_ids) or any(map(index.__contains__, additions)):
+        return False
+    ids.extend(new_ids)
+    index.update(additions)
+    return True
+
+
+def append_rows(starts, ends, flat, additions):
+    """
+    Moves every row that gets additions to the end of the flat array, followed by
+    its new entries, and points the row's start and end at the new slice.
+    """
+    for row, added in additions.items():
+        start = len(flat)
+        flat.extend(flat[starts[row]:ends[row]])
+        flat.extend(sorted(added))
+        starts[row] = start
+        ends[row] = len(flat)
+
+
+def build_csr(count, sources, targets):
+    """
+    Returns the (offsets, targets) CSR arrays for the edges sources[i] -> targets[i]
+    over `count` source indexes, dropping duplicate edges.
+    """
+    # count the edges of every source
+    offsets = array(OFFSET, [0]) * (count + 1)
+    for source in sources:
+        offsets[source + 1] += 1
+    offsets = array(OFFSET, accumulate(offsets))
+
+    # place every target in the slot range of its source
+    flat = array(INDEX, [0]) * len(targets)
+    position = array(OFFSET, offsets)
+    for source, target in zip(sources, targets):
+        flat[position[source]] = target
+        position[source] += 1
+
+    # sort each range and squeeze out the duplicates
+    rows = []
+    lengths = array(OFFSET, [0]) * count
+    for source in range(count):
+        start, end = offsets[source], offsets[source + 1]
+        if end - start > 1:
+            row = sorted(set(flat[start:end]))
+            rows.extend(row)
+            lengths[source] = len(row)
+        elif end > start:
+            rows.append(flat[start])
+            lengths[source] = 1
+    return array(OFFSET, accumulate(lengths, initial=0)), array(INDEX, rows)
@@ -0,0 +1,153 @@
+"""
+Bulk degrees tables: the distance from a few hub people, like Kevin Bacon, to everyone.
+
+Every hub needs one full single-source search, and the hubs are searched in
+parallel by a process pool. The workers map the dataset's snapshot, which is
+written first if it is missing or stale, so the graph is shared through the page
+cache instead of being parsed or copied once per worker.
+
+Hubs are read one per line, as person ids or as names that exactly one person
+has, since a table for a guessed person is worse than none. The results are
+streamed to a binary file as each hub finishes, in the order the hubs were given:
+
+    header   "DEGHUBS\\0", then person count and hub count as little endian uint32
+    per hub  the hub's person index as a little endian int32, then one byte per
+             person with the distance from the hub, 255 if not connected
+
+Person indexes follow the order of the dataset's snapshot (graph.person_ids).
+Per-hub throughput is reported on stderr and a JSON summary with the distance
+histograms is printed when the job is done.
+
+Usage: python hubs.py [--workers N] directory hubs output
+"""
+import json
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+
+import degrees
+import levels
+from snapshot import is_fresh
+
+MAGIC = b"DEGHUBS\0"
+HEADER = struct.Struct("<8sII")
+HUB = struct.Struct("<i")
+
+
+def hub_id(line):
+    """
+    Returns the person id of a hubs line, or exits if the line is neither an id
+    nor the exact name of exactly one person.
+    """
+    if line in degrees.people:
+        return line
+    person_ids = degrees.get_name_index().exact(line)
+    if not person_ids:
+        sys.exit(f"Person not found: {line}")
+    if len(person_ids) > 1:
+        shown = ", ".join(person_ids[:10]) + (", ..." if len(person_ids) > 10 else "")
+        sys.exit(f"{len(person_ids)} people are named {line}, use one of the ids {shown}")
+    return person_ids[0]
+
+
+def hub_distances(person):
+    """
+    Runs in a pool worker and returns (distances, seconds) for one hub person index.
+    """
+    start = time.perf_counter()
+    row = levels.distances(degrees.graph, person)
+    return bytes(row), time.perf_counter() - start
+
+
+def read_results(path):
+    """
+    Yields (person index, distances) for every hub of a results file.
+    """
+    with open(path, "rb") as f:
+        magic, person_count, hub_count = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a hubs results file")
+        for _ in range(hub_count):
+            (person,) = HUB.unpack(f.read(HUB.size))
+            yield person, f.read(person_count)
+
+
+def run(directory, hub_ids, output, workers=None):
+    """
+    Writes the distances from every hub person id to the output file and
+    returns a summary of the job.
+    """
+    graph = degrees.graph
+    hubs = [graph.person_index[person_id] for person_id in hub_ids]
+    person_count = graph.person_count()
+    summary = {"directory": directory, "people": person_count, "hubs": []}
+    totals = []
+    unreachable_total = 0
+
+    start = time.perf_counter()
+    with open(output, "wb") as f, \
+            ProcessPoolExecutor(max_workers=workers, initializer=degrees.load_worker, initargs=(directory,)) as pool:
+        f.write(HEADER.pack(MAGIC, person_count, len(hubs)))
+        for person_id, person, (row, seconds) in zip(hub_ids, hubs, pool.map(hub_distances, hubs)):
+            f.write(HUB.pack(person))
+            f.write(row)
+
+            counts, unreachable = levels.histogram(row)
+            reached = person_count - unreachable
+            rate = reached / seconds if seconds > 0 else float("inf")
+            name = degrees.people[person_id]["name"]
+            print(f"{person_id} ({name}): {reached:,} people reached in {seconds:.2f}s ({rate:,.0f} people/s)",
+                  file=sys.stderr)
+            summary["hubs"].append({
+                "id": person_id,
+                "name": name,
+                "seconds": seconds,
+                "reached": reached,
+                "people_per_second": rate,
+                "histogram": counts,
+                "unreachable": unreachable,
+            })
+
+            for distance, count in enumerate(counts):
+                if distance == len(totals):
+                    totals.append(0)
+                totals[distance] += count
+            unreachable_total += unreachable
+
+    summary["seconds"] = time.perf_counter() - start
+    summary["histogram"] = totals
+    summary["unreachable"] = unreachable_total
+    return summary
+
+
+def main():
+    args = sys.argv[1:]
+    workers = None
+    if len(args) >= 2 and args[0] == "--workers":
+        workers = int(args[1])
+        args = args[2:]
+    if len(args) != 3:
+        sys.exit("Usage: python hubs.py [--workers N] directory hubs output")
+    directory, hubs_path, output = args
+
+    # the workers share the graph by mapping the snapshot
+    sources = [f"{directory}/{name}" for name in degrees.CSV_FILES]
+    if not is_fresh(f"{directory}/{degrees.SNAPSHOT_FILE}", sources):
+        print(f"Writing {directory}/{degrees.SNAPSHOT_FILE}...", file=sys.stderr)
+        with redirect_stdout(sys.stderr):
+            degrees.build_cache(directory)
+    degrees.load_data(directory)
+
+    hub_ids = []
+    with open(hubs_path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                hub_ids.append(hub_id(line.strip()))
+
+    print(json.dumps(run(directory, hub_ids, output, workers)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+A landmark (ALT) distance index over the people graph.
+
+A few well spread people are picked as landmarks and the degrees of separation
+from every landmark to every person are stored. By the triangle inequality,
+|d(L, s) - d(L, t)| <= d(s, t) <= d(L, s) + d(L, t) for every landmark L, which
+gives instant lower and upper bounds and an admissible A* heuristic.
+
+Usage: python landmarks.py directory [count]
+"""
+import math
+import sys
+from array import array
+
+from levels import UNREACHABLE, distances as bfs_distances
+from snapshot import SnapshotError, is_fresh, read_snapshot, write_snapshot
+
+DEFAULT_LANDMARKS = 16
+LANDMARKS_FILE = "degrees.landmarks"
+
+
+class LandmarkIndex():
+    def __init__(self, landmarks, distances):
+        # landmarks is an array of person indexes,
+        # distances holds one row of len(graph) distances per landmark
+        self.landmarks = landmarks
+        self.distances = distances
+        self.size = len(distances) // len(landmarks) if len(landmarks) else 0
+
+    @classmethod
+    def build(cls, graph, count=DEFAULT_LANDMARKS):
+        """
+        Picks `count` landmarks by farthest-first selection and measures the
+        distance from each of them to every person.
+        """
+        size = graph.person_count()
+        landmarks = array("i")
+        distances = array("B")
+        # the smallest distance from any landmark so far, used to pick the next one
+        closest = array("B", [UNREACHABLE]) * size
+
+        for _ in range(min(count, size)):
+            if len(landmarks) == 0:
+                # start from the person with the most movies
+                landmark = max(range(size), key=graph.filmography_size)
+            else:
+                # otherwise take the reachable person farthest from every landmark
+                landmark = max(range(size), key=lambda p: closest[p] if closest[p] != UNREACHABLE else -1)
+                if closest[landmark] in (0, UNREACHABLE):
+                    break
+            row = bfs_distances(graph, landmark)
+            landmarks.append(landmark)
+            distances.extend(row)
+            for person in range(size):
+                if row[person] < closest[person]:
+                    closest[person] = row[person]
+        return cls(landmarks, distances)
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between two
+        person indexes. Both are math.inf if the pair is provably not connected.
+        """
+        lower = 0
+        upper = math.inf
+        distances = self.distances
+        size = self.size
+        for i in range(len(self.landmarks)):
+            to_source = distances[i * size + source]
+            to_target = distances[i * size + target]
+            if to_source == UNREACHABLE and to_target == UNREACHABLE:
+                continue
+            if to_source == UNREACHABLE or to_target == UNREACHABLE:
+                # a landmark reaches only one of them, so they are not connected
+                return math.inf, math.inf
+            lower = max(lower, abs(to_source - to_target))
+            upper = min(upper, to_source + to_target)
+        return lower, upper
+
+    def heuristic(self, target):
+        """
+        Returns a function that estimates the distance from a person to the target
+        without ever overestimating it.
+        """
+        distances = self.distances
+        size = self.size
+        rows = []
+        for i in range(len(self.landmarks)):
+            to_target = distances[i * size + target]
+            if to_target != UNREACHABLE:
+                rows.append((i * size, to_target))
+
+        def estimate(person):
+            best = 0
+            for start, to_target in rows:
+                to_person = distances[start + person]
+                if to_person != UNREACHABLE and abs(to_person - to_target) > best:
+                    best = abs(to_person - to_target)
+            return best
+        return estimate
+
+    def save(self, path):
+        write_snapshot(path, {"landmarks.people": self.landmarks, "landmarks.distances": self.distances})
+
+    @classmethod
+    def load(cls, path):
+        sections = read_snapshot(path)
+        return cls(sections["landmarks.people"], sections["landmarks.distances"])
+
+
+def load_index(directory, sources, person_count):
+    """
+    Returns the landmark index stored in the directory, or None if it is missing,
+    older than the given source files or built for another dataset.
+    """
+    path = f"{directory}/{LANDMARKS_FILE}"
+    if not is_fresh(path, sources):
+        return None
+    try:
+        index = LandmarkIndex.load(path)
+    except SnapshotError:
+        return None
+    if index.size != person_count:
+        return None
+    return index
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python landmarks.py directory [count]")
+    directory = sys.argv[1]
+    count = int(sys.argv[2]) if len(sys.argv) == 3 else DEFAULT_LANDMARKS
+
+    import degrees
+    degrees.load_data(directory)
+    index = LandmarkIndex.build(degrees.graph, count)
+    index.save(f"{directory}/{LANDMARKS_FILE}")
+    print(f"{len(index.landmarks)} landmarks written to {directory}/{LANDMARKS_FILE}.")
+
+
+if __name__ == "__main__":
+    main()
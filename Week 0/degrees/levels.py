@@ -0,0 +1,91 @@
+"""
+Distances from one person to everyone, one whole BFS level at a time.
+
+The star relation is a sparse person x movie matrix, stored as CSR rows on both
+sides. A level of the search is two masked sparse products: the frontier of
+people selects the movies in their rows that were not expanded yet, then those
+movies select the people in their rows that have no distance yet. Every movie
+row is expanded at most once per search, so a full search touches each star
+once from either side, and the inner loops only walk contiguous row slices.
+
+Distances are kept in one byte per person, like the landmark index.
+
+Usage: python levels.py directory name
+"""
+import sys
+import time
+from array import array
+
+# distances are stored in one byte, this value marks unreachable people
+UNREACHABLE = 255
+
+
+def distances(graph, source, max_depth=UNREACHABLE - 1):
+    """
+    Returns an array with the degrees of separation from the source person index
+    to every person, UNREACHABLE for people further than max_depth or not connected.
+    """
+    (person_starts, person_ends, person_movies,
+     movie_starts, movie_ends, movie_people) = graph.arrays()
+
+    result = array("B", [UNREACHABLE]) * graph.person_count()
+    expanded = bytearray(graph.movie_count())
+    result[source] = 0
+    frontier = [source]
+    depth = 0
+    while frontier and depth < max_depth:
+        depth += 1
+
+        # the movies of the frontier that no earlier level reached
+        movies = []
+        for person in frontier:
+            for movie in person_movies[person_starts[person]:person_ends[person]]:
+                if not expanded[movie]:
+                    expanded[movie] = 1
+                    movies.append(movie)
+
+        # the people of those movies that have no distance yet
+        frontier = []
+        for movie in movies:
+            for person in movie_people[movie_starts[movie]:movie_ends[movie]]:
+                if result[person] == UNREACHABLE:
+                    result[person] = depth
+                    frontier.append(person)
+    return result
+
+
+def histogram(row):
+    """
+    Returns the number of people at every distance of a distance array, from 0 up
+    to the largest finite distance, followed by the number of unreachable people.
+    """
+    data = bytes(row)
+    unreachable = data.count(UNREACHABLE)
+    finite = [distance for distance in set(data) if distance != UNREACHABLE]
+    counts = [data.count(distance) for distance in range(max(finite) + 1)] if finite else []
+    return counts, unreachable
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python levels.py directory name")
+    directory, name = sys.argv[1], sys.argv[2]
+
+    import degrees
+    degrees.load_data(directory)
+    person_id = degrees.person_id_for_name(name, interactive=False)
+    if person_id is None:
+        sys.exit("Person not found.")
+
+    start = time.perf_counter()
+    row = distances(degrees.graph, degrees.graph.person_index[person_id])
+    seconds = time.perf_counter() - start
+    counts, unreachable = histogram(row)
+    print(f"Distances from {degrees.people[person_id]['name']} to {len(row):,} people in {seconds:.2f}s.")
+    for distance, count in enumerate(counts):
+        print(f"{distance}: {count:,}")
+    print(f"Not connected: {unreachable:,}")
+
+
+if __name__ == "__main__":
+    main()
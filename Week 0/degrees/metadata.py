@@ -0,0 +1,346 @@
+"""
+Columnar storage for people and movie metadata.
+
+Instead of one dictionary per record, every field is a column aligned with the
+graph's integer indexes. Free text (names, titles) is kept as one UTF-8 byte array
+with offsets and is only decoded when a record is read. Short repetitive values
+(birth years, release years) are interned: every distinct value is stored once and
+records keep a small code. Columns loaded from a snapshot stay in the memory map,
+and values changed or added later are kept beside them instead of copying them.
+
+A Table maps IMDB ids to lightweight record views, so code written for the old
+dictionaries, like people[person_id]["name"], keeps working.
+"""
+from array import array
+
+from snapshot import as_array
+
+
+class StringColumn():
+    """
+    A column of strings stored back to back as UTF-8 bytes.
+    """
+    def __init__(self, data=None, offsets=None):
+        self.data = data if data is not None else array("B")
+        self.offsets = offsets if offsets is not None else array("q", [0])
+        # values replaced after they were appended, by row
+        self.overrides = {}
+        # values appended to a read only snapshot view, after its rows
+        self.added = []
+
+    def __len__(self):
+        return len(self.offsets) - 1 + len(self.added)
+
+    def get(self, row):
+        if self.overrides and row in self.overrides:
+            return self.overrides[row]
+        if row >= len(self.offsets) - 1:
+            return self.added[row - len(self.offsets) + 1]
+        return bytes(self.data[self.offsets[row]:self.offsets[row + 1]]).decode("utf-8")
+
+    def set(self, row, value):
+        if row < len(self):
+            self.overrides[row] = value
+            return
+        if not isinstance(self.data, array):
+            self.added.append(value)
+            return
+        self.data.frombytes(value.encode("utf-8"))
+        self.offsets.append(len(self.data))
+
+    def make_growable(self):
+        """
+        Copies a snapshot view into arrays of its own, followed by the values added to it.
+        """
+        if isinstance(self.data, array):
+            return
+        added = self.added
+        self.data = as_array(self.data)
+        self.offsets = as_array(self.offsets)
+        self.added = []
+        for value in added:
+            self.set(len(self), value)
+
+    def extend(self, data, ends):
+        """
+        Appends many values at once, given as UTF-8 bytes and the end of every value
+        in them, like ingest.encode_text returns.
+        """
+        self.make_growable()
+        shift = len(self.data)
+        self.data.frombytes(data)
+        self.offsets.extend(map(shift.__add__, ends) if shift else ends)
+
+    def sections(self, prefix):
+        self.compact()
+        return {f"{prefix}.data": self.data, f"{prefix}.offsets": self.offsets}
+
+    def compact(self):
+        """
+        Writes the overridden and added values back into the byte array.
+        """
+        if self.added:
+            self.make_growable()
+        if not self.overrides:
+            return
+        values = [self.get(row) for row in range(len(self))]
+        self.data = array("B")
+        self.offsets = array("q", [0])
+        self.overrides = {}
+        for value in values:
+            self.set(len(self), value)
+
+    @classmethod
+    def from_sections(cls, sections, prefix):
+        return cls(sections[f"{prefix}.data"], sections[f"{prefix}.offsets"])
+
+
+class CodedColumn():
+    """
+    A column of interned strings: every distinct value is stored once and every row
+    keeps the code of its value.
+    """
+    def __init__(self, values=None, codes=None):
+        self.values = values if values is not None else []
+        self.codes = codes if codes is not None else array("i")
+        self.lookup = {value: code for code, value in enumerate(self.values)}
+        # codes changed in, and appended to, a read only snapshot view
+        self.changed = {}
+        self.added = array("i")
+
+    def __len__(self):
+        return len(self.codes) + len(self.added)
+
+    def get(self, row):
+        if self.changed and row in self.changed:
+            return self.values[self.changed[row]]
+        if row >= len(self.codes):
+            return self.values[self.added[row - len(self.codes)]]
+        return self.values[self.codes[row]]
+
+    def select(self, keep):
+        """
+        Returns a bytearray with a 1 for every row whose value keep(value) accepts,
+        calling keep only once for every distinct value.
+        """
+        flags = [1 if keep(value) else 0 for value in self.values]
+        selected = bytearray(map(flags.__getitem__, self.codes))
+        selected.extend(map(flags.__getitem__, self.added))
+        for row, code in self.changed.items():
+            selected[row] = flags[code]
+        return selected
+
+    def set(self, row, value):
+        code = self.lookup.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self.lookup[value] = code
+        if isinstance(self.codes, array):
+            if row < len(self.codes):
+                self.codes[row] = code
+            else:
+                self.codes.append(code)
+        elif row < len(self.codes):
+            self.changed[row] = code
+        elif row - len(self.codes) < len(self.added):
+            self.added[row - len(self.codes)] = code
+        else:
+            self.added.append(code)
+
+    def make_growable(self):
+        """
+        Copies a snapshot view into an array of its own, with the changed and added codes.
+        """
+        if isinstance(self.codes, array):
+            return
+        self.codes = as_array(self.codes)
+        for row, code in self.changed.items():
+            self.codes[row] = code
+        self.codes.extend(self.added)
+        self.changed = {}
+        self.added = array("i")
+
+    def extend(self, values, codes):
+        """
+        Appends many values at once, given as distinct values and the code of every
+        row in them, like ingest.encode_coded returns.
+        """
+        remap = []
+        for value in values:
+            code = self.lookup.get(value)
+            if code is None:
+                code = len(self.values)
+                self.values.append(value)
+                self.lookup[value] = code
+            remap.append(code)
+        self.make_growable()
+        self.codes.extend(map(remap.__getitem__, codes))
+
+    def sections(self, prefix):
+        values = StringColumn()
+        for value in self.values:
+            values.set(len(values), value)
+        sections = values.sections(f"{prefix}.values")
+        self.make_growable()
+        sections[f"{prefix}.codes"] = self.codes
+        return sections
+
+    @classmethod
+    def from_sections(cls, sections, prefix):
+        values = StringColumn.from_sections(sections, f"{prefix}.values")
+        return cls([values.get(code) for code in range(len(values))], sections[f"{prefix}.codes"])
+
+
+class Record():
+    """
+    A read only view of one row of a table, used like the old record dictionaries.
+    """
+    __slots__ = ("table", "row")
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    def __getitem__(self, field):
+        return self.table.columns[field].get(self.row)
+
+    def get(self, field, default=None):
+        if field not in self.table.columns:
+            return default
+        return self[field]
+
+    def keys(self):
+        return self.table.columns.keys()
+
+    def as_dict(self):
+        return {field: self[field] for field in self.table.columns}
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            other = other.as_dict()
+        return self.as_dict() == other
+
+    def __repr__(self):
+        return repr(self.as_dict())
+
+
+class Table():
+    """
+    Maps the IMDB ids of one side of the graph ("person" or "movie") to record views.
+    Records must be added after their id is added to the graph.
+    """
+    def __init__(self, graph, side, fields):
+        # fields maps every field name to its column class
+        self.graph = graph
+        self.side = side
+        self.fields = fields
+        self.clear()
+
+    def clear(self):
+        self.columns = {field: column() for field, column in self.fields.items()}
+
+    def index(self):
+        return getattr(self.graph, f"{self.side}_index")
+
+    def ids(self):
+        return getattr(self.graph, f"{self.side}_ids")
+
+    def __getitem__(self, key):
+        return Record(self, self.index()[key])
+
+    def __setitem__(self, key, values):
+        row = self.index()[key]
+        for field, column in self.columns.items():
+            column.set(row, values[field])
+
+    def extend(self, columns):
+        """
+        Appends the records of the ids just added to the graph in bulk. `columns`
+        maps every field to the arguments of its column's extend method.
+        """
+        for field, column in self.columns.items():
+            column.extend(*columns[field])
+
+    def __contains__(self, key):
+        return key in self.index()
+
+    def __iter__(self):
+        return iter(self.ids())
+
+    def __len__(self):
+        return len(self.index())
+
+    def get(self, key, default=None):
+        row = self.index().get(key)
+        return default if row is None else Record(self, row)
+
+    def items(self):
+        for key in self:
+            yield key, self[key]
+
+    def sections(self, prefix):
+        sections = {}
+        for field, column in self.columns.items():
+            sections.update(column.sections(f"{prefix}.{field}"))
+        return sections
+
+    def load_sections(self, sections, prefix):
+        """
+        Replaces the columns with views of a snapshot's sections, nothing is decoded.
+        """
+        self.columns = {field: column.from_sections(sections, f"{prefix}.{field}")
+                        for field, column in self.fields.items()}
+
+
+class NameMap():
+    """
+    Maps lowercase names to the set of ids of the people with that name, like the
+    old `names` dictionary, but it is only built the first time it is used.
+    It keeps the people's rows, which `rows` returns without looking up any ids.
+    """
+    def __init__(self, people):
+        self.people = people
+        self.mapping = None
+
+    def clear(self):
+        self.mapping = None
+
+    def built(self):
+        if self.mapping is None:
+            mapping = {}
+            name_column = self.people.columns["name"]
+            for row in range(len(name_column)):
+                mapping.setdefault(name_column.get(row).lower(), set()).add(row)
+            self.mapping = mapping
+        return self.mapping
+
+    def rows(self, name):
+        """
+        Returns the rows of the people with this lowercase name.
+        """
+        return self.built().get(name, ())
+
+    def add(self, name, person_id):
+        if self.mapping is not None:
+            self.mapping.setdefault(name.lower(), set()).add(self.people.index()[person_id])
+
+    def discard(self, name, person_id):
+        if self.mapping is not None and name.lower() in self.mapping:
+            self.mapping[name.lower()].discard(self.people.index()[person_id])
+
+    def __getitem__(self, name):
+        ids = self.people.ids()
+        return {ids[row] for row in self.built()[name]}
+
+    def __contains__(self, name):
+        return name in self.built()
+
+    def __iter__(self):
+        return iter(self.built())
+
+    def __len__(self):
+        return len(self.built())
+
+    def get(self, name, default=None):
+        return self[name] if name in self.built() else default
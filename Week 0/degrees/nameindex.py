@@ -0,0 +1,207 @@
+"""
+An index over people's names for prefix and fuzzy lookups.
+
+Names are normalized to lowercase. Prefix lookups use binary search over the
+sorted list of names, which behaves like a flattened trie. Fuzzy lookups use an
+inverted index from character trigrams to names: the rarest trigrams of the query
+produce candidates, the most promising of which are then ranked by how many of the
+query's trigrams they share.
+New names can be added one at a time without rebuilding the index.
+
+Every lookup returns person ids ranked by how well the name matches and then by
+filmography size, so the best known person comes first.
+"""
+import heapq
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import compress, groupby
+from operator import itemgetter
+
+# how many candidate names a fuzzy lookup scores at most
+MAX_CANDIDATES = 200
+
+# the lowest fuzzy score best() accepts as a match
+MIN_SCORE = 0.5
+
+# the shortest prefix best() accepts, and the shortest it accepts when several people match it
+MIN_UNIQUE_PREFIX = 2
+MIN_PREFIX = 4
+
+
+class NameIndex():
+    def __init__(self, names, people, graph=None):
+        """
+        Builds the index from the `names` map and `people` table of degrees,
+        using the graph, if given, to rank people by their number of movies.
+        People are handled by row and only turned into ids once they are ranked.
+        """
+        self.names = names
+        self.people = people
+        self.graph = graph
+        self.births = people.columns["birth"]
+        self.sorted_names = sorted(names)
+
+        # every name gets a fixed position in entries and its number of distinct
+        # trigrams in sizes, and every trigram maps to the ascending positions of
+        # the names that contain it, built by the first fuzzy lookup
+        self.entries = []
+        self.sizes = array("H")
+        self.postings = None
+
+    def trigram_postings(self):
+        if self.postings is None:
+            self.postings = {}
+            for name in self.sorted_names:
+                self.add_entry(name)
+        return self.postings
+
+    def add_entry(self, name):
+        if self.postings is None:
+            return
+        grams = set(trigrams(name))
+        self.entries.append(name)
+        self.sizes.append(min(len(grams), 0xFFFF))
+        for gram in grams:
+            self.postings.setdefault(gram, array("i")).append(len(self.entries) - 1)
+
+    def add(self, name):
+        """
+        Adds a name that was just added to the `names` dictionary, if it is new to the index.
+        """
+        name = name.lower()
+        position = bisect_left(self.sorted_names, name)
+        if position < len(self.sorted_names) and self.sorted_names[position] == name:
+            return
+        insort(self.sorted_names, name)
+        self.add_entry(name)
+
+    def rank(self, row):
+        """
+        Returns a sort key for the person in this row that puts the people with
+        the most movies first, older people before younger ones among equals, and
+        then people in the order they were loaded.
+        """
+        movies = self.graph.filmography_size(row) if self.graph is not None else 0
+        birth = self.births.get(row)
+        return (-movies, int(birth) if birth.isdigit() else 9999, row)
+
+    def ranked(self, rows, limit=None):
+        """
+        Returns the ids of the people in these rows, ranked, up to `limit` of them.
+        """
+        ids = self.people.ids()
+        return [ids[row] for row in sorted(rows, key=self.rank)[:limit]]
+
+    def exact(self, name):
+        """
+        Returns the ranked person ids with exactly this name.
+        """
+        return self.ranked(self.names.rows(name.lower()))
+
+    def prefix(self, text, limit=10):
+        """
+        Returns up to `limit` ranked person ids whose name starts with the text.
+        """
+        text = text.lower()
+        matches = []
+        position = bisect_left(self.sorted_names, text)
+        while position < len(self.sorted_names) and self.sorted_names[position].startswith(text):
+            matches.extend(self.names.rows(self.sorted_names[position]))
+            position += 1
+            # stop scanning very common prefixes, ranking is only needed for the top
+            if len(matches) >= limit * 20:
+                break
+        return self.ranked(matches, limit)
+
+    def fuzzy(self, text, limit=10, min_score=0.0):
+        """
+        Returns up to `limit` (person_id, score) pairs for names similar to the text,
+        with scores between min_score and 1, best first.
+        """
+        text = text.lower()
+        grams = set(trigrams(text))
+        if not grams:
+            return []
+
+        # generate candidates from the rarest trigrams, so common ones like " th" stay cheap
+        index = self.trigram_postings()
+        lists = sorted((index[gram] for gram in grams if gram in index), key=len)
+        split = max(1, (len(lists) + 1) // 2)
+        rare, common = lists[:split], lists[split:]
+        counts = Counter()
+        for postings in rare:
+            counts.update(postings)
+
+        if not counts:
+            return []
+
+        # of the names that share nearly as many rare trigrams as the best ones, keep
+        # those with the best possible score, as if they had every common trigram
+        sizes = self.sizes
+        threshold = max(counts.values()) - 1
+        candidates = heapq.nlargest(
+            MAX_CANDIDATES, compress(counts.items(), map(threshold.__le__, counts.values())),
+            key=lambda item: (item[1] + len(common)) / (len(grams) + sizes[item[0]]),
+        )
+
+        # score them by the Dice coefficient of their trigram sets, finding the
+        # common trigrams they share by binary search in the ascending postings
+        scored = []
+        for position, shared in candidates:
+            for postings in common:
+                at = bisect_left(postings, position)
+                if at < len(postings) and postings[at] == position:
+                    shared += 1
+            score = 2 * shared / (len(grams) + sizes[position])
+            if score >= min_score:
+                scored.append((score, self.entries[position]))
+
+        # rank only the people of the best names, one score at a time, until there are enough
+        scored.sort(key=itemgetter(0), reverse=True)
+        found = []
+        for score, group in groupby(scored, key=itemgetter(0)):
+            if len(found) >= limit:
+                break
+            rows = [row for _, name in group for row in self.names.rows(name)]
+            found.extend((person_id, score) for person_id in self.ranked(rows))
+        return found[:limit]
+
+    def candidates(self, text, limit=10, min_score=0.0):
+        """
+        Returns up to `limit` ranked person ids for the text: exact matches first,
+        then prefix matches, then fuzzy matches.
+        """
+        found = []
+        for person_id in self.exact(text) + self.prefix(text, limit):
+            if person_id not in found:
+                found.append(person_id)
+        if len(found) < limit:
+            for person_id, _ in self.fuzzy(text, limit, min_score):
+                if person_id not in found:
+                    found.append(person_id)
+        return found[:limit]
+
+    def best(self, text):
+        """
+        Returns the single best person id for the text, or None if nothing matches
+        well enough: an exact match, then a prefix of MIN_PREFIX characters or one
+        only a single person matches, then a fuzzy match scoring at least MIN_SCORE.
+        """
+        found = self.exact(text)
+        if found:
+            return found[0]
+        text = text.strip()
+        found = self.prefix(text) if len(text) >= MIN_UNIQUE_PREFIX else []
+        if len(found) == 1 or (found and len(text) >= MIN_PREFIX):
+            return found[0]
+        found = self.fuzzy(text, 1, MIN_SCORE)
+        return found[0][0] if found else None
+
+
+def trigrams(name):
+    """
+    Returns the character trigrams of the name, padded so word starts and ends count.
+    """
+    padded = f"  {name} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
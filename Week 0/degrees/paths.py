@@ -0,0 +1,106 @@
+"""
+Counting and listing all the shortest paths between two people.
+
+A breadth-first search from the source labels every person with their distance
+and the number of shortest paths that reach them, which is the sum of the counts
+of their parents one layer closer, once per shared movie. The search stops after
+the target's layer. Counting never builds a path. Listing walks back from the target
+through the layers, one path at a time, so only the current path is kept in memory.
+"""
+
+
+class ShortestPaths():
+    def __init__(self, graph, source, target):
+        """
+        Runs the layered search between two person indexes.
+        """
+        self.graph = graph
+        self.source = source
+        self.target = target
+        # distance and number of shortest paths of every person reached so far
+        self.distance = {source: 0}
+        self.count = {source: 1}
+        self.search()
+
+    def search(self):
+        graph = self.graph
+        (person_starts, person_ends, person_movies,
+         movie_starts, movie_ends, movie_people) = graph.arrays()
+        distance = self.distance
+        count = self.count
+
+        frontier = [self.source]
+        depth = 0
+        while frontier and self.target not in distance:
+            depth += 1
+            next_frontier = []
+            for person in frontier:
+                paths = count[person]
+                for i in range(person_starts[person], person_ends[person]):
+                    movie = person_movies[i]
+                    for j in range(movie_starts[movie], movie_ends[movie]):
+                        neighbor = movie_people[j]
+                        seen = distance.get(neighbor)
+                        if seen is None:
+                            distance[neighbor] = depth
+                            count[neighbor] = paths
+                            next_frontier.append(neighbor)
+                        elif seen == depth:
+                            count[neighbor] += paths
+            frontier = next_frontier
+
+    def degrees(self):
+        """
+        Returns the degrees of separation, or None if the people are not connected.
+        """
+        return self.distance.get(self.target)
+
+    def total(self):
+        """
+        Returns the number of distinct shortest (movie, person) paths.
+        """
+        return self.count.get(self.target, 0)
+
+    def paths(self, limit=None):
+        """
+        Yields up to `limit` shortest paths, each a list of (movie, person) index pairs.
+        """
+        if self.target not in self.distance or limit == 0:
+            return
+        if self.target == self.source:
+            yield []
+            return
+        distance = self.distance
+        produced = 0
+
+        # each stack entry is an iterator over the ways to step one layer closer to the source
+        path = []
+        stack = [self.steps_back(self.target, distance[self.target])]
+        while stack:
+            step = next(stack[-1], None)
+            if step is None:
+                stack.pop()
+                if path:
+                    path.pop()
+                continue
+            movie, parent, person = step
+            path.append((movie, person))
+            if parent == self.source:
+                yield list(reversed(path))
+                produced += 1
+                if limit is not None and produced >= limit:
+                    return
+                path.pop()
+            else:
+                stack.append(self.steps_back(parent, distance[parent]))
+
+    def steps_back(self, person, depth):
+        """
+        Yields (movie, parent, person) for every parent one layer closer to the source.
+        """
+        graph = self.graph
+        distance = self.distance
+        for movie in graph.movies_of(person):
+            for parent in graph.stars_of(movie):
+                if distance.get(parent) == depth - 1:
+                    yield movie, parent, person
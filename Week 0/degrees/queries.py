@@ -0,0 +1,158 @@
+"""
+Constrained and weighted path queries over the movie graph.
+
+A PathQuery compiles its filters (a range of years, excluded people and excluded
+movies) into masks over the graph's movie and person indexes once, and its searches
+skip masked movies and people while walking the CSR rows, so excluded edges are
+never built. Paths are found with Dijkstra's algorithm, or with A* when a landmark
+index is given and every movie costs at least `min_weight`.
+"""
+import math
+from datetime import date
+
+from util import PriorityFrontier
+
+
+class PathQuery():
+    def __init__(self, graph, movies, min_year=None, max_year=None, exclude_people=(), exclude_movies=(),
+                 weight=None, min_weight=None):
+        """
+        Prepares a query over the graph, using the `movies` dictionary of degrees for years.
+
+        weight(movie_id, year) returns the positive cost of connecting two people
+        through a movie, 1 for every movie by default. min_weight is a lower bound
+        on the weights and allows a landmark heuristic, it is 1 for the default weight.
+        """
+        self.graph = graph
+        self.movies = movies
+        self.weight = weight
+        self.min_weight = 1 if weight is None else min_weight
+
+        # compile the filters into one flag per movie and per person, checking
+        # every distinct year once and reading the movies' years by index
+        if min_year is not None or max_year is not None:
+            def in_range(value):
+                year = parse_year(value)
+                return not (year is None or (min_year is not None and year < min_year)
+                            or (max_year is not None and year > max_year))
+            self.movie_allowed = movies.columns["year"].select(in_range)
+        else:
+            self.movie_allowed = bytearray(b"\1") * graph.movie_count()
+        for movie_id in exclude_movies:
+            if movie_id in graph.movie_index:
+                self.movie_allowed[graph.movie_index[movie_id]] = 0
+
+        self.person_allowed = bytearray(b"\1") * graph.person_count()
+        for person_id in exclude_people:
+            if person_id in graph.person_index:
+                self.person_allowed[graph.person_index[person_id]] = 0
+
+        # the cost of every movie, computed the first time the movie is used
+        self.costs = {}
+
+    def cost(self, movie):
+        cost = self.costs.get(movie)
+        if cost is None:
+            if self.weight is None:
+                cost = 1
+            else:
+                movie_id = self.graph.movie_ids[movie]
+                cost = self.weight(movie_id, movie_year(self.movies, movie))
+                if cost <= 0:
+                    raise ValueError(f"weight of movie {movie_id} must be positive, got {cost}")
+            self.costs[movie] = cost
+        return cost
+
+    def shortest_path(self, source_id, target_id, landmarks=None):
+        """
+        Returns (cost, path) for the cheapest list of (movie_id, person_id) pairs
+        that connect the source to the target using only allowed movies and people,
+        or None if there is no such path.
+        """
+        graph = self.graph
+        source = graph.person_index[source_id]
+        target = graph.person_index[target_id]
+        if not self.person_allowed[source] or not self.person_allowed[target]:
+            return None
+        if source == target:
+            return 0, []
+
+        # landmark distances never overestimate, and filters only make paths longer
+        estimate = None
+        if landmarks is not None and self.min_weight:
+            if landmarks.bounds(source, target)[0] == math.inf:
+                return None
+            heuristic = landmarks.heuristic(target)
+            min_weight = self.min_weight
+            estimate = lambda person: heuristic(person) * min_weight
+
+        (person_starts, person_ends, person_movies,
+         movie_starts, movie_ends, movie_people) = graph.arrays()
+        movie_allowed = self.movie_allowed
+        person_allowed = self.person_allowed
+
+        # cost of the cheapest known path to every person and the (movie, person) it came from
+        distance = {source: 0}
+        parents = {source: None}
+        done = set()
+        frontier = PriorityFrontier()
+        frontier.add(source, estimate(source) if estimate else 0)
+        while not frontier.empty():
+            person = frontier.remove()
+            if person == target:
+                return distance[target], self.path_to(target, parents)
+            done.add(person)
+            cost = distance[person]
+            for i in range(person_starts[person], person_ends[person]):
+                movie = person_movies[i]
+                if not movie_allowed[movie]:
+                    continue
+                through = cost + self.cost(movie)
+                for j in range(movie_starts[movie], movie_ends[movie]):
+                    neighbor = movie_people[j]
+                    if neighbor in done or not person_allowed[neighbor]:
+                        continue
+                    if neighbor not in distance or through < distance[neighbor]:
+                        distance[neighbor] = through
+                        parents[neighbor] = (movie, person)
+                        frontier.add(neighbor, through + (estimate(neighbor) if estimate else 0))
+        return None
+
+    def path_to(self, target, parents):
+        graph = self.graph
+        path = []
+        person = target
+        while parents[person] is not None:
+            movie, parent = parents[person]
+            path.append((graph.movie_ids[movie], graph.person_ids[person]))
+            person = parent
+        path.reverse()
+        return path
+
+
+def movie_year(movies, movie):
+    """
+    Returns the year of the movie at this index as an int, or None if it is unknown.
+    """
+    return parse_year(movies.columns["year"].get(movie))
+
+
+def parse_year(year):
+    """
+    Returns the year string as an int, or None if it is unknown.
+    """
+    return int(year) if year.isdigit() else None
+
+
+def recency_weight(current_year=None, half_life=20):
+    """
+    Returns a weight function that prefers recent movies: a movie from this year
+    costs 1 and the cost doubles every `half_life` years back. Movies without a
+    year cost as much as the oldest ones. Its min_weight is 1.
+    """
+    current_year = current_year or date.today().year
+
+    def weight(movie_id, year):
+        age = current_year - year if year is not None else 100
+        return 2 ** (max(0, age) / half_life)
+    return weight
@@ -0,0 +1,237 @@
+"""
+A long-running degrees query service.
+
+The dataset is loaded once and requests are answered over TCP or a Unix socket
+with a JSON lines protocol: every request is one JSON object on its own line,
+
+    {"id": 1, "method": "shortest_path", "params": {"source": "102", "target": "129"}}
+    {"id": 2, "method": "lookup", "params": {"name": "tom cru", "limit": 5}}
+    {"id": 3, "method": "stats"}
+
+and every response is one JSON object with the same id and either a "result" or an
+"error". Requests on a connection are handled concurrently, so responses may come
+back in a different order. Searches run in a process pool, each worker holding its
+own copy of the dataset (shared with the parent through fork or the snapshot).
+Name lookups run in threads over a name index built at startup.
+Searches check their deadline themselves, so a timed out search stops in its
+worker instead of holding it until it finishes.
+
+Usage: python service.py directory [--port N | --unix PATH] [--workers N] [--timeout SECONDS]
+"""
+import asyncio
+import json
+import math
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import degrees
+
+DEFAULT_PORT = 8050
+DEFAULT_TIMEOUT = 10.0
+
+# the methods a request can call, each one gets its own latency histogram
+METHODS = ("shortest_path", "lookup", "stats")
+
+
+class LatencyHistogram():
+    """
+    Counts request latencies in power of two buckets, starting at 0.1 milliseconds.
+    """
+    BASE = 0.1
+    BUCKETS = 24
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, milliseconds):
+        bucket = 0
+        if milliseconds > self.BASE:
+            bucket = min(self.BUCKETS - 1, math.ceil(math.log2(milliseconds / self.BASE)))
+        self.counts[bucket] += 1
+        self.total += 1
+        self.sum += milliseconds
+        self.max = max(self.max, milliseconds)
+
+    def quantile(self, q):
+        """
+        Returns an upper bound on the q-th quantile, in milliseconds.
+        """
+        if self.total == 0:
+            return 0.0
+        rank = q * self.total
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.BASE * 2 ** bucket, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.total,
+            "mean_ms": self.sum / self.total if self.total else 0.0,
+            "p50_ms": self.quantile(0.5),
+            "p90_ms": self.quantile(0.9),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": self.max,
+            "buckets_ms": {f"<={self.BASE * 2 ** bucket:g}": count
+                           for bucket, count in enumerate(self.counts) if count},
+        }
+
+
+class RequestError(Exception):
+    pass
+
+
+def search(source, target, deadline):
+    """
+    Runs in a pool worker and returns the shortest path between two person ids.
+    The search gives up by itself at the deadline, so a timed out request frees its worker.
+    """
+    return degrees.shortest_path(source, target, deadline=deadline)
+
+
+def lookup(name, limit):
+    """
+    Runs in a thread and returns the people whose name best matches the text.
+    """
+    return [{"id": person_id, "name": degrees.people[person_id]["name"], "birth": degrees.people[person_id]["birth"]}
+            for person_id in degrees.get_name_index().candidates(name, limit)]
+
+
+class Service():
+    def __init__(self, directory, workers=None, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self.histograms = {}
+        # build the name index with its fuzzy postings now, not during the first lookup,
+        # lookup threads only read it afterwards
+        degrees.get_name_index().trigram_postings()
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=degrees.load_worker, initargs=(directory,))
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    async def handle_connection(self, reader, writer):
+        """
+        Answers the requests of one connection until it is closed.
+        """
+        lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.create_task(self.respond(line, writer, lock))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def respond(self, line, writer, lock):
+        start = time.perf_counter()
+        endpoint = "invalid"
+        response = {"id": None}
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise RequestError("request must be a JSON object")
+            response["id"] = request.get("id")
+            method = request.get("method")
+            if method not in METHODS:
+                raise RequestError(f"unknown method {method!r}")
+            endpoint = method
+            params = request.get("params") or {}
+            if not isinstance(params, dict):
+                raise RequestError("params must be a JSON object")
+            response["result"] = await self.dispatch(method, params)
+        except (asyncio.TimeoutError, degrees.SearchTimeout):
+            response["error"] = f"timed out after {self.timeout}s"
+        except (RequestError, ValueError) as error:
+            response["error"] = str(error)
+        except Exception as error:
+            # every request gets an answer, even if the service itself failed, like a broken pool
+            response["error"] = f"internal error: {type(error).__name__}: {error}"
+
+        self.histograms.setdefault(endpoint, LatencyHistogram()).record((time.perf_counter() - start) * 1000)
+        async with lock:
+            writer.write((json.dumps(response) + "\n").encode("utf-8"))
+            await writer.drain()
+
+    async def dispatch(self, method, params):
+        if method == "shortest_path":
+            return await self.shortest_path(params)
+        elif method == "lookup":
+            return await self.lookup(params)
+        else:
+            return {name: histogram.summary() for name, histogram in self.histograms.items()}
+
+    async def shortest_path(self, params):
+        source = params.get("source")
+        target = params.get("target")
+        for person_id in (source, target):
+            if not isinstance(person_id, str) or person_id not in degrees.people:
+                raise RequestError(f"unknown person id {person_id!r}")
+
+        loop = asyncio.get_running_loop()
+        deadline = time.time() + self.timeout
+        path = await asyncio.wait_for(loop.run_in_executor(self.pool, search, source, target, deadline),
+                                      self.timeout)
+        if path is None:
+            return {"degrees": None, "path": None}
+        return {
+            "degrees": len(path),
+            "path": [{"movie": movie_id, "person": person_id} for movie_id, person_id in path],
+        }
+
+    async def lookup(self, params):
+        name = params.get("name")
+        limit = params.get("limit", 10)
+        if not isinstance(name, str):
+            raise RequestError("lookup needs a name")
+        if not isinstance(limit, int) or limit < 1:
+            raise RequestError("limit must be a positive integer")
+
+        # lookups run in a thread, so a slow one doesn't hold up the other connections
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(None, lookup, name, limit), self.timeout)
+
+
+async def serve(service, port=None, unix=None):
+    if unix is not None:
+        server = await asyncio.start_unix_server(service.handle_connection, path=unix)
+    else:
+        server = await asyncio.start_server(service.handle_connection, "127.0.0.1", port)
+    print(f"Serving on {unix or f'127.0.0.1:{port}'}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0].startswith("--"):
+        sys.exit("Usage: python service.py directory [--port N | --unix PATH] [--workers N] [--timeout SECONDS]")
+    directory = args[0]
+    options = dict(zip(args[1::2], args[2::2]))
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(directory)
+    service = Service(directory, int(options["--workers"]) if "--workers" in options else None,
+                      float(options.get("--timeout", DEFAULT_TIMEOUT)))
+    try:
+        asyncio.run(serve(service, int(options.get("--port", DEFAULT_PORT)), options.get("--unix")))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
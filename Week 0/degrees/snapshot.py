@@ -0,0 +1,117 @@
+"""
+A versioned binary snapshot format for the loaded dataset.
+
+A snapshot file starts with a magic string, a format version and a JSON header
+describing its sections. Every section is a flat array of a single type code,
+aligned to 8 bytes, so it can be used straight from a memory map without copying.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+MAGIC = b"DEGSNAP\0"
+VERSION = 3
+
+# magic, version and length of the JSON header
+PREAMBLE = struct.Struct("<8sII")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def write_snapshot(path, sections):
+    """
+    Writes the sections, a dictionary of names to arrays, to a snapshot file.
+    """
+    # lay the sections out one after the other, each one aligned to 8 bytes
+    sections = {name: as_array(data) for name, data in sections.items()}
+    layout = {}
+    offset = 0
+    for name, data in sections.items():
+        offset = align(offset)
+        layout[name] = [data.typecode, offset, len(data)]
+        offset += len(data) * data.itemsize
+
+    header = json.dumps({"byteorder": sys.byteorder, "sections": layout}).encode()
+    start = align(PREAMBLE.size + len(header))
+
+    # write to a temporary file first, so readers never see a half written snapshot
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for name, data in sections.items():
+            f.write(bytes(start + layout[name][1] - f.tell()))
+            data.tofile(f)
+    os.replace(temporary, path)
+
+
+def read_snapshot(path):
+    """
+    Returns a dictionary of section names to memoryviews over a memory map of the file.
+    Raises SnapshotError if the file can't be read or is empty, truncated or damaged.
+    """
+    try:
+        with open(path, "rb") as f:
+            memory = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as error:
+        # mmap refuses empty files with a ValueError
+        raise SnapshotError(f"{path} can't be mapped: {error}") from error
+
+    try:
+        return parse_snapshot(path, memory)
+    except (KeyError, TypeError, ValueError, struct.error) as error:
+        # json and UTF-8 decoding errors are ValueErrors too
+        raise SnapshotError(f"{path} is damaged: {error!r}") from error
+
+
+def parse_snapshot(path, memory):
+    magic, version, length = PREAMBLE.unpack_from(memory)
+    if magic != MAGIC:
+        raise SnapshotError(f"{path} is not a snapshot")
+    if version != VERSION:
+        raise SnapshotError(f"{path} has version {version}, expected {VERSION}")
+    header = json.loads(memory[PREAMBLE.size:PREAMBLE.size + length])
+    if header["byteorder"] != sys.byteorder:
+        raise SnapshotError(f"{path} was written on a {header['byteorder']} endian machine")
+
+    start = align(PREAMBLE.size + length)
+    view = memoryview(memory)
+    sections = {}
+    for name, (typecode, offset, count) in header["sections"].items():
+        size = count * array(typecode).itemsize
+        if start + offset + size > len(memory):
+            raise SnapshotError(f"{path} is truncated in section {name}")
+        sections[name] = view[start + offset:start + offset + size].cast(typecode)
+    return sections
+
+
+def is_fresh(path, sources):
+    """
+    Returns True if the snapshot exists and is newer than all of its source files.
+    """
+    try:
+        built = os.path.getmtime(path)
+    except OSError:
+        return False
+    return all(os.path.getmtime(source) <= built for source in sources)
+
+
+def as_array(data):
+    """
+    Returns the data as an array, copying it out of a memoryview if needed.
+    """
+    if isinstance(data, array):
+        return data
+    # copy the raw bytes at once rather than converting every item
+    copy = array(data.format)
+    copy.frombytes(data.cast("B"))
+    return copy
+
+
+def align(offset):
+    return (offset + 7) & ~7
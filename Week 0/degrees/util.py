@@ -1,3 +1,64 @@
+import heapq
+import itertools
+import json
+import sys
+import time
+from collections import deque
+
+
+class SearchStats():
+    """
+    Counters and phase timings for one search, filled in only when a search is
+    given a SearchStats object, so searches without one pay nothing for them.
+    """
+    def __init__(self, search=None):
+        self.search = search
+        self.nodes_expanded = 0
+        self.neighbor_calls = 0
+        self.frontier_peak = 0
+        self.visited = 0
+        self.phases = {}
+        self.current = None
+        self.started = None
+
+    def phase(self, name):
+        """
+        Ends the current phase, if any, and starts timing the named one.
+        """
+        now = time.perf_counter()
+        if self.current is not None:
+            self.phases[self.current] = self.phases.get(self.current, 0.0) + now - self.started
+        self.current = name
+        self.started = now
+
+    def finish(self):
+        """
+        Ends the current phase.
+        """
+        self.phase(None)
+
+    def observe_frontier(self, size):
+        if size > self.frontier_peak:
+            self.frontier_peak = size
+
+    def as_dict(self):
+        return {
+            "search": self.search,
+            "nodes_expanded": self.nodes_expanded,
+            "neighbor_calls": self.neighbor_calls,
+            "frontier_peak": self.frontier_peak,
+            "visited": self.visited,
+            "phase_seconds": dict(self.phases),
+            "total_seconds": sum(self.phases.values()),
+        }
+
+    def log(self, stream=None):
+        """
+        Writes the stats as one JSON line, to stderr by default.
+        """
+        print(json.dumps(self.as_dict()), file=stream or sys.stderr)
+
+
 class Node():
     def __init__(self):
         self.node = []
@@ -25,37 +86,154 @@ class Node():
 
 
 
+def state_of(node):
+    """
+    Returns the state of a frontier node: its `state` attribute if it has one,
+    otherwise the last item of an (action, state) pair, otherwise the node itself.
+    """
+    state = getattr(node, "state", None)
+    if state is not None:
+        return state
+    if isinstance(node, (list, tuple)):
+        return node[-1]
+    return node
+
+
 class StackFrontier():
-    def __init__(self):
-        self.frontier = []
+    """
+    A last in, first out frontier. Adding, removing and checking whether a state
+    is in the frontier all take constant time.
+    """
+    def __init__(self, stats=None, state=state_of):
+        self.frontier = deque()
+        self.stats = stats
+        self.state = state
+        # how many nodes of every state are in the frontier
+        self.states = {}
 
     def add(self, node):
         self.frontier.append(node)
+        state = self.state(node)
+        self.states[state] = self.states.get(state, 0) + 1
+        if self.stats is not None:
+            self.stats.observe_frontier(len(self.frontier))
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return state in self.states
 
     def empty(self):
         return len(self.frontier) == 0
 
+    def __len__(self):
+        return len(self.frontier)
+
     def remove(self):
         if self.empty():
             raise Exception("empty frontier")
+        node = self.take()
+        state = self.state(node)
+        if self.states[state] == 1:
+            del self.states[state]
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
-            return node
+            self.states[state] -= 1
+        return node
+
+    def take(self):
+        return self.frontier.pop()
 
     def show(self):
+        """
+        Returns the node remove would return, without removing it.
+        """
         return self.frontier[-1]
 
 
 class QueueFrontier(StackFrontier):
+    """
+    A first in, first out frontier.
+    """
+    def take(self):
+        return self.frontier.popleft()
+
+    def show(self):
+        return self.frontier[0]
+
+
+class PriorityFrontier():
+    """
+    A frontier that always removes the node with the lowest priority.
+
+    Adding a state that is already in the frontier with a lower priority replaces
+    it (decrease-key). The replaced heap entry is only marked as removed and skipped
+    later, so every operation takes logarithmic time.
+    """
+    def __init__(self, stats=None, state=state_of):
+        self.heap = []
+        self.stats = stats
+        self.state = state
+        # maps every state in the frontier to its live heap entry
+        self.entries = {}
+        # breaks ties between equal priorities in insertion order
+        self.counter = itertools.count()
+
+    def add(self, node, priority):
+        """
+        Adds the node, or lowers the priority of its state if it is already in the frontier.
+        Returns False if the state is already in the frontier with a priority at least as low.
+        """
+        state = self.state(node)
+        entry = self.entries.get(state)
+        if entry is not None:
+            if entry[0] <= priority:
+                return False
+            # mark the old entry as removed, it is skipped when it reaches the top
+            entry[2] = None
+        entry = [priority, next(self.counter), node]
+        self.entries[state] = entry
+        heapq.heappush(self.heap, entry)
+        if self.stats is not None:
+            self.stats.observe_frontier(len(self.entries))
+        return True
+
+    def contains_state(self, state):
+        return state in self.entries
+
+    def priority(self, state):
+        """
+        Returns the priority of the state in the frontier, or None if it isn't in it.
+        """
+        entry = self.entries.get(state)
+        return entry[0] if entry is not None else None
+
+    def empty(self):
+        return len(self.entries) == 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def discard_removed(self):
+        while self.heap and self.heap[0][2] is None:
+            heapq.heappop(self.heap)
 
     def remove(self):
-        if self.empty():
+        """
+        Removes and returns the node with the lowest priority.
+        """
+        return self.remove_with_priority()[1]
+
+    def remove_with_priority(self):
+        """
+        Removes the node with the lowest priority and returns (priority, node).
+        """
+        self.discard_removed()
+        if not self.heap:
             raise Exception("empty frontier")
-        else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
-            return node
+        priority, _, node = heapq.heappop(self.heap)
+        del self.entries[self.state(node)]
+        return priority, node
+
+    def show(self):
+        self.discard_removed()
+        if not self.heap:
+            raise Exception("empty frontier")
+        return self.heap[0][2]
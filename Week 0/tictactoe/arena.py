@@ -0,0 +1,171 @@
+"""
+A headless arena for the Tic Tac Toe AI
+
+Two engines play each other for a number of games, swapping X and O every game.
+The games are spread over a process pool. The results are printed, or written
+to a file, as JSON: games per second, move latency percentiles and nodes
+searched per engine, and the first engine's win, draw and loss rates.
+
+Engines:
+    table   the perfect play table lookup of tictactoe.minimax
+    search  the alpha-beta search, with its transposition table cleared every game
+    mnk     the m,n,k engine on the 3,3,3 game, with a per move budget
+    random  a random legal move
+
+Usage: python arena.py [--engines table,random] [--games N] [--workers N]
+                       [--budget MILLISECONDS] [--seed N] [--output FILE]
+"""
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import bitboard
+import mnk
+import search
+import tictactoe as ttt
+from state import GameState
+
+ENGINES = ["table", "search", "mnk", "random"]
+DEFAULT_ENGINES = ["table", "random"]
+DEFAULT_GAMES = 1000
+DEFAULT_BUDGET = 100
+
+
+def make_engine(name, budget, rng):
+    """
+    Returns a function that takes a board and returns (action, nodes searched).
+    """
+    if name == "table":
+        return lambda board: (ttt.minimax(board), 0)
+
+    if name == "search":
+        def move(board):
+            nodes = search.search_stats["nodes"]
+            _, cell = search.alpha_beta(GameState.from_board(board), -math.inf, math.inf)
+            return bitboard.action(cell), search.search_stats["nodes"] - nodes
+        return move
+
+    if name == "mnk":
+        engine = mnk.Engine(budget)
+
+        def move(board):
+            action = engine.best_move(mnk.Board.from_rows(board, 3))
+            return action, engine.nodes
+        return move
+
+    return lambda board: (rng.choice(sorted(ttt.actions(board))), 0)
+
+
+def play_games(engines, games, budget, seed):
+    """
+    Plays the numbered games in this process and returns their results: the index
+    of the engine that won every game (None for a draw), and the latency in
+    milliseconds and nodes of every move of each engine.
+    """
+    results = {"winners": [], "latencies": [[], []], "nodes": [0, 0]}
+    for game in games:
+        rng = random.Random(seed * 1000003 + game)
+        players = [make_engine(name, budget, rng) for name in engines]
+        # the engines swap sides every game
+        first = game % 2
+        search.transposition_table.clear()
+
+        board = ttt.initial_state()
+        turn = first
+        while not ttt.terminal(board):
+            start = time.perf_counter()
+            action, nodes = players[turn](board)
+            results["latencies"][turn].append((time.perf_counter() - start) * 1000)
+            results["nodes"][turn] += nodes
+            board = ttt.result(board, action)
+            turn = 1 - turn
+
+        winner = ttt.winner(board)
+        if winner is None:
+            results["winners"].append(None)
+        else:
+            # the engine that moved first played X
+            results["winners"].append(first if winner == ttt.X else 1 - first)
+    return results
+
+
+def run(engines, games, workers=None, budget=DEFAULT_BUDGET, seed=0):
+    """
+    Plays the games across a process pool and returns the report.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = [range(start, games, workers * 4) for start in range(min(games, workers * 4))]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(play_games, [engines] * len(chunks), chunks,
+                              [budget] * len(chunks), [seed] * len(chunks)))
+    seconds = time.perf_counter() - start
+
+    winners = [winner for part in parts for winner in part["winners"]]
+    report = {
+        "engines": engines,
+        "games": games,
+        "workers": workers,
+        "budget_ms": budget,
+        "seed": seed,
+        "seconds": seconds,
+        "games_per_second": games / seconds if seconds > 0 else None,
+        "first": {
+            "engine": engines[0],
+            "win_rate": winners.count(0) / games if games else None,
+            "draw_rate": winners.count(None) / games if games else None,
+            "loss_rate": winners.count(1) / games if games else None,
+        },
+        "players": [],
+    }
+    for index, name in enumerate(engines):
+        latencies = [latency for part in parts for latency in part["latencies"][index]]
+        nodes = sum(part["nodes"][index] for part in parts)
+        # the 1st to 99th percentiles, quantiles needs two values to interpolate between
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+        report["players"].append({
+            "engine": name,
+            "wins": winners.count(index),
+            "moves": len(latencies),
+            "p50_ms": cuts[49] if cuts else None,
+            "p90_ms": cuts[89] if cuts else None,
+            "p99_ms": cuts[98] if cuts else None,
+            "mean_ms": sum(latencies) / len(latencies) if latencies else None,
+            "nodes": nodes,
+            "nodes_per_move": nodes / len(latencies) if latencies else None,
+        })
+    return report
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) % 2 != 0:
+        sys.exit(__doc__.split("\n\n")[-1].strip())
+    options = dict(zip(args[::2], args[1::2]))
+    engines = options.get("--engines", ",".join(DEFAULT_ENGINES)).split(",")
+    games = int(options.get("--games", DEFAULT_GAMES))
+    workers = int(options["--workers"]) if "--workers" in options else None
+    budget = int(options.get("--budget", DEFAULT_BUDGET))
+    seed = int(options.get("--seed", 0))
+    if len(engines) != 2:
+        sys.exit("Expected two engines, like --engines table,random")
+    for engine in engines:
+        if engine not in ENGINES:
+            sys.exit(f"Unknown engine {engine}, expected one of {', '.join(ENGINES)}")
+
+    report = json.dumps(run(engines, games, workers, budget, seed), indent=2)
+    if "--output" in options:
+        with open(options["--output"], "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
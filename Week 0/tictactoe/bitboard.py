@@ -0,0 +1,150 @@
+"""
+Tic Tac Toe boards as bitboards
+
+A position is two 9 bit ints, one for the cells of X and one for the cells of O.
+Cell (i, j) is bit 3 * i + j. Positions are plain ints, so a move makes a new
+position without copying anything, and lines are checked against precomputed masks.
+The eight rotations and reflections of a position are the same game, canonical()
+picks one of them so caches need a single entry for all eight.
+"""
+
+X = "X"
+O = "O"
+EMPTY = None
+
+# all nine cells
+FULL = 0b111111111
+
+# the eight winning lines as masks: rows, columns and diagonals
+WIN_MASKS = (
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100,
+)
+
+
+def cell(action):
+    """
+    Returns the bit number of an (i, j) action.
+    """
+    return 3 * int(action[0]) + int(action[1])
+
+
+def action(cell):
+    """
+    Returns the (i, j) action of a bit number.
+    """
+    return divmod(cell, 3)
+
+
+def to_bits(board):
+    """
+    Returns the (x, o) bitboards of a board of nested lists.
+    """
+    x = o = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == X:
+                x |= 1 << (3 * i + j)
+            elif board[i][j] == O:
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def to_board(x, o):
+    """
+    Returns the board of nested lists of the (x, o) bitboards.
+    """
+    return [[X if x >> (3 * i + j) & 1 else O if o >> (3 * i + j) & 1 else EMPTY for j in range(3)]
+            for i in range(3)]
+
+
+def player(x, o):
+    """
+    Returns the player who has the next turn, X moves first.
+    """
+    return X if x.bit_count() == o.bit_count() else O
+
+
+def actions(x, o):
+    """
+    Returns the bit numbers of the empty cells.
+    """
+    empty = FULL & ~(x | o)
+    return [cell for cell in range(9) if empty >> cell & 1]
+
+
+def play(x, o, cell):
+    """
+    Returns the (x, o) bitboards after the player to move takes the cell.
+    """
+    if x.bit_count() == o.bit_count():
+        return x | 1 << cell, o
+    return x, o | 1 << cell
+
+
+def winner(x, o):
+    """
+    Returns the winner, if there is one.
+    """
+    for mask in WIN_MASKS:
+        if x & mask == mask:
+            return X
+        if o & mask == mask:
+            return O
+    return None
+
+
+def terminal(x, o):
+    """
+    Returns True if someone won or the board is full.
+    """
+    return (x | o) == FULL or winner(x, o) is not None
+
+
+def utility(x, o):
+    """
+    Returns 1 if X has won, -1 if O has won, 0 otherwise.
+    """
+    won = winner(x, o)
+    return 1 if won == X else -1 if won == O else 0
+
+
+# the eight symmetries of the board (rotations and reflections), each as the cell
+# every cell moves to, as functions of (i, j)
+SYMMETRIES = tuple(
+    tuple(3 * i2 + j2 for i2, j2 in (transform(i, j) for i in range(3) for j in range(3)))
+    for transform in (
+        lambda i, j: (i, j),
+        lambda i, j: (j, 2 - i),
+        lambda i, j: (2 - i, 2 - j),
+        lambda i, j: (2 - j, i),
+        lambda i, j: (i, 2 - j),
+        lambda i, j: (2 - i, j),
+        lambda i, j: (j, i),
+        lambda i, j: (2 - j, 2 - i),
+    )
+)
+
+# the cell every cell comes from, to map moves back
+INVERSES = tuple(tuple(symmetry.index(cell) for cell in range(9)) for symmetry in SYMMETRIES)
+
+# every 9 bit mask under every symmetry, so transforming a bitboard is one lookup
+MASK_MAPS = tuple(
+    tuple(sum(1 << symmetry[cell] for cell in range(9) if mask >> cell & 1) for mask in range(1 << 9))
+    for symmetry in SYMMETRIES
+)
+
+
+def canonical(x, o):
+    """
+    Returns (x, o, symmetry) for the smallest of the eight symmetric versions of the
+    bitboards, so all of them share one cache entry. Cells of the canonical position
+    map back with INVERSES[symmetry].
+    """
+    best = None
+    for symmetry, masks in enumerate(MASK_MAPS):
+        position = (masks[x], masks[o], symmetry)
+        if best is None or position < best:
+            best = position
+    return best
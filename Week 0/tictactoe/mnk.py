@@ -0,0 +1,407 @@
+"""
+m,n,k games: Tic Tac Toe on an m x n board where k in a row wins
+
+Tic Tac Toe is the 3,3,3 game, gomoku is 15,15,5. Every k long window of cells
+in a row, column or diagonal is a line, and the lines through every cell are
+precomputed. A Board keeps how many stones each player has on every line while
+moves are made and unmade, so wins are detected by the move that completes a line
+and the heuristic score is updated from the lines through the played cell only.
+
+The Engine searches with iterative deepening negamax alpha-beta, a transposition
+table over Zobrist hashes and move ordering (the table's move first, then cells
+on the most crowded lines). It stops when its time budget runs out and plays the
+best move of the deepest search so far.
+
+Usage: python mnk.py [m n k] [--budget MILLISECONDS]
+"""
+import math
+import random
+import sys
+import time
+
+X = "X"
+O = "O"
+EMPTY = None
+
+# the score of a won game, less the number of moves it took so faster wins score higher
+WIN = 10 ** 9
+
+# on boards with more cells than this, only cells near stones are searched
+WIDE_BOARD = 25
+NEAR = 2
+
+DEFAULT_BUDGET = 1000
+CHECK_LEAVES = 16
+MAX_ENTRIES = 1 << 20
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class Timeout(Exception):
+    pass
+
+
+class Game():
+    """
+    The line tables of an m,n,k game, shared by all its boards.
+    """
+    def __init__(self, m=3, n=3, k=3):
+        if k > max(m, n):
+            raise ValueError("k must fit on the board")
+        self.m, self.n, self.k = m, n, k
+        self.size = m * n
+
+        # every k long window in the four directions
+        self.lines = []
+        for i in range(m):
+            for j in range(n):
+                for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_i, end_j = i + di * (k - 1), j + dj * (k - 1)
+                    if 0 <= end_i < m and 0 <= end_j < n:
+                        self.lines.append(tuple((i + di * step) * n + j + dj * step for step in range(k)))
+        self.cell_lines = [[] for _ in range(self.size)]
+        for line, cells in enumerate(self.lines):
+            for cell in cells:
+                self.cell_lines[cell].append(line)
+
+        # the cells within NEAR steps of every cell, used to pick moves on wide boards
+        self.neighbors = [
+            [a * n + b for a in range(max(0, i - NEAR), min(m, i + NEAR + 1))
+             for b in range(max(0, j - NEAR), min(n, j + NEAR + 1)) if (a, b) != (i, j)]
+            for i in range(m) for j in range(n)
+        ]
+
+        # the heuristic value of a line with this many stones of one player and none of the other
+        self.weights = [0] + [4 ** count for count in range(1, k)] + [0]
+
+        # random keys for Zobrist hashing, one per cell and player
+        rng = random.Random(m * 10000 + n * 100 + k)
+        self.keys = [[rng.getrandbits(64) for _ in range(self.size)] for _ in range(2)]
+
+    def cell(self, action):
+        i, j = action
+        if not (0 <= i < self.m and 0 <= j < self.n):
+            raise ValueError("invalid action")
+        return i * self.n + j
+
+    def action(self, cell):
+        return divmod(cell, self.n)
+
+
+class Board():
+    """
+    A position of a game, changed in place by make and unmake.
+    """
+    def __init__(self, game):
+        self.game = game
+        self.cells = [EMPTY] * game.size
+        self.moves = []
+        # stones of X and of O on every line
+        self.counts = ([0] * len(game.lines), [0] * len(game.lines))
+        # stones within NEAR steps of every cell
+        self.near = [0] * game.size
+        # the heuristic score for X, the Zobrist hash and the winner
+        self.score = 0
+        self.hash = 0
+        self.won = None
+
+    @classmethod
+    def from_rows(cls, rows, k):
+        """
+        Returns the board of nested lists of X, O and EMPTY, like tictactoe's boards.
+        Stones are placed X first, alternating, so the board must be a legal position.
+        """
+        game = Game(len(rows), len(rows[0]), k)
+        board = cls(game)
+        x_cells = [game.cell((i, j)) for i, row in enumerate(rows) for j, value in enumerate(row) if value == X]
+        o_cells = [game.cell((i, j)) for i, row in enumerate(rows) for j, value in enumerate(row) if value == O]
+        if len(x_cells) - len(o_cells) not in (0, 1):
+            raise ValueError("invalid board")
+        for index in range(len(x_cells) + len(o_cells)):
+            board.make(x_cells[index // 2] if index % 2 == 0 else o_cells[index // 2])
+        return board
+
+    def rows(self):
+        n = self.game.n
+        return [self.cells[i * n:(i + 1) * n] for i in range(self.game.m)]
+
+    def player(self):
+        return X if len(self.moves) % 2 == 0 else O
+
+    def winner(self):
+        return self.won
+
+    def terminal(self):
+        return self.won is not None or len(self.moves) == self.game.size
+
+    def utility(self):
+        return 1 if self.won == X else -1 if self.won == O else 0
+
+    def actions(self):
+        """
+        Returns the empty cells worth searching: all of them on small boards,
+        the ones near stones on wide boards.
+        """
+        game = self.game
+        cells = self.cells
+        if game.size <= WIDE_BOARD:
+            return [cell for cell in range(game.size) if cells[cell] is EMPTY]
+        if not self.moves:
+            return [game.cell((game.m // 2, game.n // 2))]
+        near = self.near
+        return [cell for cell in range(game.size) if cells[cell] is EMPTY and near[cell]]
+
+    def line_value(self, line):
+        x, o = self.counts[0][line], self.counts[1][line]
+        if o == 0:
+            return self.game.weights[x]
+        if x == 0:
+            return -self.game.weights[o]
+        return 0
+
+    def make(self, cell):
+        """
+        Plays the cell for the player to move.
+        """
+        game = self.game
+        if self.cells[cell] is not EMPTY or self.won is not None:
+            raise ValueError("invalid action")
+        side = len(self.moves) % 2
+        self.cells[cell] = X if side == 0 else O
+        self.moves.append(cell)
+        self.hash ^= game.keys[side][cell]
+        for neighbor in game.neighbors[cell]:
+            self.near[neighbor] += 1
+
+        counts = self.counts[side]
+        for line in game.cell_lines[cell]:
+            before = self.line_value(line)
+            counts[line] += 1
+            self.score += self.line_value(line) - before
+            if counts[line] == game.k:
+                self.won = self.cells[cell]
+
+    def unmake(self):
+        """
+        Takes back the last move.
+        """
+        game = self.game
+        cell = self.moves.pop()
+        side = len(self.moves) % 2
+        self.cells[cell] = EMPTY
+        self.hash ^= game.keys[side][cell]
+        for neighbor in game.neighbors[cell]:
+            self.near[neighbor] -= 1
+
+        counts = self.counts[side]
+        for line in game.cell_lines[cell]:
+            before = self.line_value(line)
+            counts[line] -= 1
+            self.score += self.line_value(line) - before
+        self.won = None
+
+    def urgency(self, cell):
+        """
+        Returns how crowded the lines through an empty cell are, for move ordering.
+        """
+        weights = self.game.weights
+        x_counts, o_counts = self.counts
+        total = 0
+        for line in self.game.cell_lines[cell]:
+            x, o = x_counts[line], o_counts[line]
+            if o == 0:
+                total += weights[x]
+            if x == 0:
+                total += weights[o]
+        return total
+
+
+class Engine():
+    """
+    Iterative deepening alpha-beta search under a time budget per move.
+    The transposition table is kept between moves.
+    """
+    def __init__(self, budget=DEFAULT_BUDGET):
+        # the budget is in milliseconds
+        self.budget = budget
+        self.table = {}
+        self.nodes = 0
+        self.depth = 0
+        self.deadline = math.inf
+
+    def best_move(self, board):
+        """
+        Returns the best (i, j) action for the player to move, or None if the game is over.
+        """
+        if board.terminal():
+            return None
+        self.nodes = 0
+        self.depth = 0
+        self.deadline = time.perf_counter() + self.budget / 1000
+        if len(self.table) > MAX_ENTRIES:
+            self.table.clear()
+
+        moves = self.order(board, board.actions(), None)
+        best = moves[0]
+        remaining = board.game.size - len(board.moves)
+        for depth in range(1, remaining + 1):
+            try:
+                value, move = self.root(board, moves, depth)
+            except Timeout as timeout:
+                # a partly searched depth still improves on the last one once a move is done
+                if timeout.args and timeout.args[0] is not None:
+                    best = timeout.args[0]
+                break
+            best = move
+            self.depth = depth
+            # search the best move first at the next depth
+            moves.remove(move)
+            moves.insert(0, move)
+            if abs(value) >= WIN - board.game.size:
+                break
+        return board.game.action(best)
+
+    def root(self, board, moves, depth):
+        alpha, beta = -math.inf, math.inf
+        best = None
+        for cell in moves:
+            # the deadline counts from before the root moves were ordered
+            if time.perf_counter() > self.deadline:
+                raise Timeout(best)
+            board.make(cell)
+            try:
+                value = -self.negamax(board, depth - 1, -beta, -alpha, 1)
+            except Timeout:
+                board.unmake()
+                raise Timeout(best)
+            board.unmake()
+            if value > alpha:
+                alpha, best = value, cell
+        return alpha, best
+
+    def negamax(self, board, depth, alpha, beta, ply):
+        """
+        Returns the score of the board for the player to move, exact between alpha and beta.
+        """
+        # nodes that order their moves are where the time goes, so they check
+        # the clock every time and leaves check it every CHECK_LEAVES nodes
+        self.nodes += 1
+        if (depth > 0 or self.nodes % CHECK_LEAVES == 0) and time.perf_counter() > self.deadline:
+            raise Timeout()
+
+        # the previous move ended the game
+        if board.won is not None:
+            return -(WIN - ply)
+        if len(board.moves) == board.game.size:
+            return 0
+        if depth == 0:
+            return board.score if len(board.moves) % 2 == 0 else -board.score
+
+        entry = self.table.get(board.hash)
+        table_move = None
+        if entry is not None:
+            entry_depth, value, flag, table_move = entry
+            value = from_table(value, ply, board.game.size)
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return value
+                if flag == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+
+        original_alpha = alpha
+        best, best_move = -math.inf, None
+        for cell in self.order(board, board.actions(), table_move):
+            board.make(cell)
+            try:
+                value = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                board.unmake()
+            if value > best:
+                best, best_move = value, cell
+                alpha = max(alpha, value)
+                if alpha >= beta:
+                    break
+
+        if best <= original_alpha:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[board.hash] = (depth, to_table(best, ply, board.game.size), flag, best_move)
+        return best
+
+    def order(self, board, moves, first):
+        moves.sort(key=board.urgency, reverse=True)
+        if first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+        return moves
+
+
+def to_table(value, ply, size):
+    """
+    Returns the score to store in the transposition table for a node `ply` moves
+    from the root. Mate scores count the moves from the root, so they are stored
+    counted from the node instead, which stays right when the table is used at
+    another ply or on a later move.
+    """
+    if value >= WIN - size:
+        return value + ply
+    if value <= -(WIN - size):
+        return value - ply
+    return value
+
+
+def from_table(value, ply, size):
+    """
+    Returns a score of the transposition table counted from the root again.
+    """
+    if value >= WIN - size:
+        return value - ply
+    if value <= -(WIN - size):
+        return value + ply
+    return value
+
+
+def print_board(board):
+    for row in board.rows():
+        print(" ".join("." if cell is EMPTY else cell for cell in row))
+    print()
+
+
+def main():
+    args = sys.argv[1:]
+    budget = DEFAULT_BUDGET
+    if "--budget" in args:
+        position = args.index("--budget")
+        budget = int(args[position + 1])
+        del args[position:position + 2]
+    if len(args) not in (0, 3):
+        sys.exit("Usage: python mnk.py [m n k] [--budget MILLISECONDS]")
+    game = Game(*map(int, args)) if args else Game()
+
+    # the user plays X against the engine
+    board = Board(game)
+    engine = Engine(budget)
+    while not board.terminal():
+        print_board(board)
+        if board.player() == X:
+            move = input("Enter a move in form of 'i j': ").split()
+            try:
+                board.make(game.cell((int(move[0]), int(move[1]))))
+            except (ValueError, IndexError):
+                print("Invalid move.")
+        else:
+            action = engine.best_move(board)
+            board.make(game.cell(action))
+            print(f"{O} plays {action[0]} {action[1]} (depth {engine.depth}, {engine.nodes} nodes)")
+    print_board(board)
+    print("Tie." if board.winner() is None else f"{board.winner()} wins.")
+
+
+if __name__ == "__main__":
+    main()
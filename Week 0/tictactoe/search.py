@@ -0,0 +1,94 @@
+"""
+Full-depth alpha-beta search for Tic Tac Toe
+
+The search makes and unmakes moves on a GameState and shares one transposition
+table between searches, so positions reached again on later moves, or in one of
+their symmetric versions, are not searched again. The AI uses it for positions
+its perfect play table doesn't have, and the solver uses it to build that table.
+"""
+import math
+
+import bitboard
+from bitboard import X
+
+# a transposition table shared by all the searches of a game, so positions reached
+# again on later moves are not searched again.
+# it maps canonical (x, o) bitboards to (score, flag, best cell), where the flag tells whether the score
+# is exact or only a lower or upper bound because alpha-beta cut the search short
+transposition_table = {}
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# the number of positions the searches have visited and found in the table, for measuring
+search_stats = {"nodes": 0, "hits": 0}
+
+
+def score(state):
+    """
+    Returns the utility of a finished game, scaled up by the number of empty cells
+    so that faster wins (and slower losses) are preferred.
+    """
+    return state.utility() * (10 - state.moves)
+
+
+def alpha_beta(state, alpha, beta):
+    """
+    Returns (score, cell) for the player to move in the game state with full-depth
+    alpha-beta search, where the score is exact if it is between alpha and beta and a
+    bound otherwise. Moves are made and unmade on the state, which ends up unchanged.
+    """
+    search_stats["nodes"] += 1
+    if state.terminal():
+        return score(state), None
+
+    # use what an earlier search learned about this position or a symmetric one,
+    # the table keeps cells in the canonical position's orientation
+    cx, co, symmetry = bitboard.canonical(state.x, state.o)
+    key = (cx, co)
+    entry = transposition_table.get(key)
+    best_cell = None
+    if entry is not None:
+        search_stats["hits"] += 1
+        value, flag, best_cell = entry
+        best_cell = bitboard.INVERSES[symmetry][best_cell]
+        if flag == EXACT:
+            return value, best_cell
+        if flag == LOWER:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if alpha >= beta:
+            return value, best_cell
+
+    maximizing = state.player() == X
+    original_alpha, original_beta = alpha, beta
+
+    # try the best move of the earlier search first, it causes most cutoffs
+    moves = state.actions()
+    if best_cell in moves:
+        moves.remove(best_cell)
+        moves.insert(0, best_cell)
+
+    best = -math.inf if maximizing else math.inf
+    for cell in moves:
+        state.make(cell)
+        value, _ = alpha_beta(state, alpha, beta)
+        state.unmake()
+        if maximizing and value > best:
+            best, best_cell = value, cell
+            alpha = max(alpha, value)
+        elif not maximizing and value < best:
+            best, best_cell = value, cell
+            beta = min(beta, value)
+        # the opponent would never allow this line, stop searching it
+        if alpha >= beta:
+            break
+
+    # remember whether the score is exact or a bound
+    if best <= original_alpha:
+        flag = UPPER
+    elif best >= original_beta:
+        flag = LOWER
+    else:
+        flag = EXACT
+    transposition_table[key] = (best, flag, bitboard.SYMMETRIES[symmetry][best_cell])
+    return best, best_cell
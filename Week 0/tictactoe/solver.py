@@ -0,0 +1,135 @@
+"""
+Perfect play table for Tic Tac Toe
+
+Every position reachable from the empty board is solved once and the game value
+and optimal move of each one are stored in a small binary file, so the AI only
+has to look its move up. Symmetric positions are stored once, as their canonical
+position, and moves are mapped back to the orientation of the board asked about.
+
+The file is the magic bytes b"TICTAC2\0", the number of positions as a little
+endian uint16, the base 3 code of every canonical position as little endian uint16s
+(0 for empty, 1 for X, 2 for O, cell (i, j) is digit 3 * i + j), then one byte
+per position. A byte holds the value + 1 (X wins 2, draw 1, O wins 0) in its high
+half and the optimal cell of the canonical position in its low half, NO_MOVE for
+finished games.
+
+Usage: python solver.py [table file]
+"""
+import math
+import os
+import sys
+from array import array
+
+import bitboard
+from search import alpha_beta
+from state import GameState
+
+MAGIC = b"TICTAC2\0"
+NO_MOVE = 15
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tictactoe.table")
+
+# the base 3 code of the cells set in a 9 bit mask, with every digit 1
+DIGITS = [sum(3 ** cell for cell in range(9) if mask >> cell & 1) for mask in range(1 << 9)]
+
+
+def code(x, o):
+    """
+    Returns the base 3 code of the (x, o) bitboards.
+    """
+    return DIGITS[x] + 2 * DIGITS[o]
+
+
+def solve():
+    """
+    Returns the table of every canonical position reachable from the empty board,
+    as a dictionary from base 3 codes to entries.
+    """
+    # the full-depth search of the AI gives the exact value of every position
+    table = {}
+    stack = [(0, 0)]
+    while stack:
+        x, o, _ = bitboard.canonical(*stack.pop())
+        index = code(x, o)
+        if index in table:
+            continue
+        if bitboard.terminal(x, o):
+            table[index] = (bitboard.utility(x, o) + 1) << 4 | NO_MOVE
+            continue
+        score, cell = alpha_beta(GameState(x, o), -math.inf, math.inf)
+        value = (score > 0) - (score < 0)
+        table[index] = (value + 1) << 4 | cell
+        for move in bitboard.actions(x, o):
+            stack.append(bitboard.play(x, o, move))
+    return table
+
+
+def save_table(table, path=TABLE_FILE):
+    codes = array("H", sorted(table))
+    entries = bytes(table[index] for index in codes)
+    if sys.byteorder != "little":
+        codes.byteswap()
+    with open(path, "wb") as f:
+        f.write(MAGIC + len(codes).to_bytes(2, "little") + codes.tobytes() + entries)
+
+
+def load_table(path=TABLE_FILE):
+    """
+    Returns the table stored in the file, or None if it is missing or damaged.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    header = len(MAGIC) + 2
+    if len(data) < header or not data.startswith(MAGIC):
+        return None
+    count = int.from_bytes(data[len(MAGIC):header], "little")
+    if len(data) != header + 3 * count:
+        return None
+    codes = array("H", data[header:header + 2 * count])
+    if sys.byteorder != "little":
+        codes.byteswap()
+    return dict(zip(codes, data[header + 2 * count:]))
+
+
+def load_or_solve(path=TABLE_FILE):
+    """
+    Returns the table stored in the file, solving and saving it first if needed.
+    """
+    table = load_table(path)
+    if table is None:
+        table = solve()
+        try:
+            save_table(table, path)
+        except OSError:
+            # the table still works from memory if the directory is read only
+            pass
+    return table
+
+
+def lookup(table, x, o):
+    """
+    Returns (value, cell) of the (x, o) bitboards: the game value with perfect play
+    (1 if X wins, -1 if O wins, 0 for a draw) and the optimal cell, or None as
+    the cell of a finished game.
+    """
+    cx, co, symmetry = bitboard.canonical(x, o)
+    entry = table.get(code(cx, co))
+    if entry is None:
+        raise ValueError("unreachable position")
+    cell = entry & 0xF
+    return (entry >> 4) - 1, None if cell == NO_MOVE else bitboard.INVERSES[symmetry][cell]
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python solver.py [table file]")
+    path = sys.argv[1] if len(sys.argv) == 2 else TABLE_FILE
+    table = solve()
+    save_table(table, path)
+    print(f"{len(table)} positions written to {path}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+An incremental Tic Tac Toe game state
+
+A GameState keeps the bitboards, the number of moves and, for each of the eight
+winning lines, how many cells X and O hold on it. Making a move only updates the
+lines through the played cell, so winner, terminal and utility are answered from
+stored values, and a search can make and unmake moves on one object instead of
+building a new board for every move.
+"""
+import bitboard
+from bitboard import O, X
+
+# the winning lines through every cell, as indexes into bitboard.WIN_MASKS
+CELL_LINES = tuple(
+    tuple(line for line, mask in enumerate(bitboard.WIN_MASKS) if mask >> cell & 1) for cell in range(9)
+)
+
+
+class GameState():
+    def __init__(self, x=0, o=0):
+        """
+        Starts from the (x, o) bitboards, the empty board by default.
+        """
+        self.x = 0
+        self.o = 0
+        self.moves = 0
+        self.won = None
+        # cells held on every line by X and by O
+        self.x_lines = [0] * len(bitboard.WIN_MASKS)
+        self.o_lines = [0] * len(bitboard.WIN_MASKS)
+        # the played cells and the winner before each move, for unmake
+        self.history = []
+
+        # replay the position, alternating X and O like a game would
+        x_cells = [cell for cell in range(9) if x >> cell & 1]
+        o_cells = [cell for cell in range(9) if o >> cell & 1]
+        if len(x_cells) - len(o_cells) not in (0, 1) or x & o:
+            raise ValueError("invalid board")
+        for index in range(len(x_cells) + len(o_cells)):
+            self.place(x_cells[index // 2] if index % 2 == 0 else o_cells[index // 2])
+        self.history = []
+
+    @classmethod
+    def from_board(cls, board):
+        return cls(*bitboard.to_bits(board))
+
+    def place(self, cell):
+        # like make, but also used to set up positions that already have a winner
+        self.history.append((cell, self.won))
+        if self.moves % 2 == 0:
+            self.x |= 1 << cell
+            lines, player = self.x_lines, X
+        else:
+            self.o |= 1 << cell
+            lines, player = self.o_lines, O
+        self.moves += 1
+        for line in CELL_LINES[cell]:
+            lines[line] += 1
+            if lines[line] == 3:
+                self.won = player
+
+    def make(self, cell):
+        """
+        Plays the cell for the player to move.
+        """
+        if (self.x | self.o) >> cell & 1 or self.won is not None:
+            raise ValueError("invalid action")
+        self.place(cell)
+
+    def unmake(self):
+        """
+        Takes back the last move.
+        """
+        cell, self.won = self.history.pop()
+        self.moves -= 1
+        if self.moves % 2 == 0:
+            self.x &= ~(1 << cell)
+            lines = self.x_lines
+        else:
+            self.o &= ~(1 << cell)
+            lines = self.o_lines
+        for line in CELL_LINES[cell]:
+            lines[line] -= 1
+
+    def player(self):
+        return X if self.moves % 2 == 0 else O
+
+    def actions(self):
+        return bitboard.actions(self.x, self.o)
+
+    def winner(self):
+        return self.won
+
+    def terminal(self):
+        return self.won is not None or self.moves == 9
+
+    def utility(self):
+        return 1 if self.won == X else -1 if self.won == O else 0